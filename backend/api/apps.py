@@ -1,6 +1,48 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+
+def catalog_changed(sender, **kwargs):
+    from api.cache import CATALOG_VERSION_KEY, bump_version
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def recipes_changed(sender, **kwargs):
+    from api.cache import RECIPES_VERSION_KEY, bump_version
+    bump_version(RECIPES_VERSION_KEY)
+
+
+def author_changed(sender, instance, created=False, update_fields=None,
+                   **kwargs):
+    from api.cache import AUTHOR_FIELDS
+    if created or (update_fields is not None
+                   and not set(update_fields) & set(AUTHOR_FIELDS)):
+        # Например, вход обновляет только last_login.
+        return
+    if instance.recipes.exists():
+        recipes_changed(sender)
+
+
+def recipe_tags_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        recipes_changed(sender)
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from recipes.changelog import recipes_created
+        from recipes.deletion import recipes_deleted
+        from recipes.models import Ingredient, Recipe, Tag
+        from users.models import User
+        for model in (Tag, Ingredient):
+            post_save.connect(catalog_changed, sender=model)
+            post_delete.connect(catalog_changed, sender=model)
+        post_save.connect(recipes_changed, sender=Recipe)
+        post_delete.connect(recipes_changed, sender=Recipe)
+        recipes_created.connect(recipes_changed, sender=Recipe)
+        recipes_deleted.connect(recipes_changed, sender=Recipe)
+        m2m_changed.connect(recipe_tags_changed, sender=Recipe.tags.through)
+        post_save.connect(author_changed, sender=User)
@@ -0,0 +1,64 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api.instrumentation import collect_queries, get_current_stats
+from api.profiling import get_current_profile
+
+# Отдельный пул ограничивает число одновременных соединений с БД.
+read_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_READ_THREADS,
+    thread_name_prefix='api-read',
+)
+
+
+def run_view(view, request, *args, **kwargs):
+    with ExitStack() as stack:
+        stats = get_current_stats()
+        if stats is not None:
+            stack.enter_context(collect_queries(stats))
+        profile = get_current_profile()
+        if profile is not None:
+            # ?_profile: сэмплер и SQL переходят на поток пула.
+            stack.enter_context(profile.follow())
+        response = view(request, *args, **kwargs)
+        # Рендерим в том же потоке, чтобы не занимать общий sync-поток.
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+    return response
+
+
+def run_read_view(view, request, *args, **kwargs):
+    # Соединения потоков пула не закрываются сигналами запроса Django.
+    close_old_connections()
+    try:
+        return run_view(view, request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Асинхронная обёртка для DRF-представления.
+
+    Безопасные запросы выполняются в пуле потоков параллельно, остальные —
+    в общем sync-потоке Django, как и обычные синхронные представления.
+    """
+    read = sync_to_async(
+        functools.partial(run_read_view, view),
+        thread_sensitive=False,
+        executor=read_executor,
+    )
+    write = sync_to_async(functools.partial(run_view, view))
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,150 @@
+"""Кеши справочников, первых страниц списка и отдельных рецептов.
+
+Теги и ингредиенты держатся в памяти процесса: gunicorn загружает их
+до fork (preload_app), и воркеры делят страницы copy-on-write.
+Изменения отслеживаются номерами версий в общем кеше Django, поэтому
+устаревшая копия обновляется во всех воркерах.
+"""
+import threading
+import time
+from hashlib import blake2b
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import Ingredient, Recipe, Tag
+
+CATALOG_VERSION_KEY = 'catalog:version'
+RECIPES_VERSION_KEY = 'recipes:version'
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+AUTHOR_COLUMNS = tuple(f'author__{field}' for field in AUTHOR_FIELDS)
+
+
+def viewer_version_key(user_id):
+    """Версия избранного и списка покупок пользователя.
+
+    Повышается в AddDeleteMixin, а не сигналами Favorite и ShoppingCart:
+    сигналы на этих моделях отключили бы быстрое удаление их строк
+    пачками в recipes.deletion. Удаление рецептов повышает версию
+    рецептов, которая тоже входит в ключи.
+    """
+    return f'recipes:viewer:{user_id}:version'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = int(time.time() * 1000)
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_version(key):
+    # Читатели транзакции до фиксации не должны закешировать старые
+    # данные под новой версией.
+    transaction.on_commit(
+        lambda: cache.set(key, int(time.time() * 1000), timeout=None)
+    )
+
+
+class Catalog:
+    """Теги и ингредиенты в памяти процесса."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.version = None
+        self.loaded_at = None
+        self.tags = ()
+        self.ingredients = ()
+
+    def load(self):
+        with self.lock:
+            self.version = get_version(CATALOG_VERSION_KEY)
+            self.tags = tuple(Tag.objects.values(*TAG_FIELDS))
+            self.ingredients = tuple(
+                Ingredient.objects.values(*INGREDIENT_FIELDS)
+            )
+            self.loaded_at = time.monotonic()
+
+    def is_fresh(self):
+        return (
+            self.loaded_at is not None
+            and time.monotonic() - self.loaded_at < self.ttl
+            and self.version == get_version(CATALOG_VERSION_KEY)
+        )
+
+    def get_tags(self):
+        if not self.is_fresh():
+            self.load()
+        return [dict(tag) for tag in self.tags]
+
+    def get_ingredients(self):
+        if not self.is_fresh():
+            self.load()
+        return [dict(ingredient) for ingredient in self.ingredients]
+
+
+catalog = Catalog(ttl=settings.CATALOG_TTL)
+
+
+def recipe_list_key(request):
+    """Ключ кеша страницы списка или None, если страницу не кешируем.
+
+    Кешируются только анонимные запросы: у них нет персональных флагов
+    is_favorited и is_in_shopping_cart. Страница содержит теги и профили
+    авторов, поэтому в ключ входит и версия справочников, а правка
+    профиля автора повышает версию рецептов.
+    """
+    if request.user.is_authenticated:
+        return None
+    params = request.query_params
+    if set(params) - {'page', 'limit', 'tags', 'fields', 'expand',
+                      'facets'}:
+        return None
+    query = '&'.join(
+        f'{name}={value}' for name, value in sorted(
+            (name, value) for name in params
+            for value in params.getlist(name)
+        )
+    )
+    # Ссылки на картинки абсолютные, поэтому хост входит в ключ.
+    return (f'recipes:page:{get_version(RECIPES_VERSION_KEY)}:'
+            f'{get_version(CATALOG_VERSION_KEY)}:'
+            f'{request.scheme}://{request.get_host()}:{query}')
+
+
+def recipe_versions(ids):
+    """Версии рецептов ids для recipe_item_keys: {id: строка}.
+
+    updated_at сменяется при любой правке рецепта, его тегов и
+    ингредиентов. Профиль автора входит в закешированный рецепт, но
+    updated_at не трогает, поэтому в версию добавлен хеш его полей.
+    """
+    rows = Recipe.objects.filter(id__in=ids).values_list(
+        'id', 'updated_at', *AUTHOR_COLUMNS
+    )
+    return {
+        pk: (f'{updated_at.timestamp()}:'
+             f'{blake2b(repr(author).encode(), digest_size=8).hexdigest()}')
+        for pk, updated_at, *author in rows
+    }
+
+
+def recipe_item_keys(request, fieldset, versions):
+    """Ключи кеша отдельных рецептов по версиям из recipe_versions.
+
+    Рецепты кешируются без персональных флагов, поэтому ключ общий для
+    всех пользователей.
+    """
+    signature = (f'{",".join(fieldset.fields)}|'
+                 f'{",".join(sorted(fieldset.expand))}')
+    host = f'{request.scheme}://{request.get_host()}'
+    return {
+        pk: f'recipes:item:{pk}:{version}:{host}:{signature}'
+        for pk, version in versions.items()
+    }
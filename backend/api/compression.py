@@ -0,0 +1,112 @@
+"""Сжатие ответов gzip и brotli.
+
+brotli — необязательная зависимость: без пакета согласуется только gzip.
+Потоковые ответы сжимаются по частям с досылкой (flush) после каждой
+части, чтобы клиент получал данные без задержки.
+"""
+import zlib
+from hashlib import blake2b
+
+from django.conf import settings
+from django.core.cache import cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    @staticmethod
+    def compressor():
+        return zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL,
+                                zlib.DEFLATED, GZIP_WBITS)
+
+    def compress(self, data):
+        compressor = self.compressor()
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self, chunks):
+        compressor = self.compressor()
+        for chunk in chunks:
+            data = (compressor.compress(chunk)
+                    + compressor.flush(zlib.Z_SYNC_FLUSH))
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class BrotliCodec:
+    name = 'br'
+
+    @staticmethod
+    def compress(data):
+        return brotli.compress(data,
+                               quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    @staticmethod
+    def stream(chunks):
+        compressor = brotli.Compressor(
+            quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+# В порядке предпочтения сервера при равных q.
+CODECS = tuple(
+    codec for codec in (BrotliCodec() if brotli else None, GzipCodec())
+    if codec is not None
+)
+
+
+def parse_accept_encoding(header):
+    weights = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+    return weights
+
+
+def negotiate(header):
+    """Кодек с наибольшим q из Accept-Encoding или None."""
+    weights = parse_accept_encoding(header)
+    wildcard = weights.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for codec in CODECS:
+        quality = weights.get(codec.name, wildcard)
+        if quality > best_quality:
+            best, best_quality = codec, quality
+    return best
+
+
+def compress_cached(codec, content):
+    """Сжатые байты из кеша по хешу содержимого.
+
+    Хеш считается на порядок быстрее сжатия, поэтому горячие страницы
+    сжимаются один раз на COMPRESSION_CACHE_TTL.
+    """
+    key = (f'compressed:{codec.name}:'
+           f'{blake2b(content, digest_size=16).hexdigest()}')
+    data = cache.get(key)
+    if data is None:
+        data = codec.compress(content)
+        cache.set(key, data, settings.COMPRESSION_CACHE_TTL)
+    return data
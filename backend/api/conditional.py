@@ -0,0 +1,73 @@
+"""Условные GET для рецептов: ETag и Last-Modified.
+
+ETag — хеш всего, от чего зависит ответ: updated_at рецептов, профилей
+авторов, флагов текущего пользователя и параметров запроса. Флаги
+избранного и подписки меняются без updated_at, поэтому 304 отдаётся
+только по If-None-Match, а Last-Modified служит подсказкой для кешей.
+"""
+import hashlib
+
+from django.db.models import Exists, OuterRef
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from api.projections import USER_FIELDS, annotate_flags, get_viewer
+from users.models import Follow
+
+AUTHOR_FIELDS = tuple(f'author__{field}' for field in USER_FIELDS)
+
+
+class Validators:
+
+    def __init__(self, etag, last_modified):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def not_modified(self, request):
+        return get_conditional_response(request, etag=self.etag)
+
+    def apply(self, response):
+        if response.status_code == 200:
+            response['ETag'] = self.etag
+            if self.last_modified is not None:
+                response['Last-Modified'] = http_date(self.last_modified)
+        return response
+
+
+def recipe_states(queryset, viewer):
+    fields = ('id', 'updated_at') + AUTHOR_FIELDS
+    if viewer is not None:
+        queryset = annotate_flags(queryset, viewer).annotate(
+            is_subscribed=Exists(Follow.objects.filter(
+                user=viewer, author=OuterRef('author')
+            ))
+        )
+        fields += ('is_favorited', 'is_in_shopping_cart', 'is_subscribed')
+    return list(queryset.order_by().values_list(*fields))
+
+
+def make_validators(request, queryset, signature=()):
+    """Валидаторы ответа по рецептам queryset.
+
+    signature — то, что влияет на ответ помимо самих рецептов:
+    порядок id на странице, параметры фильтра, общее число записей.
+    """
+    viewer = get_viewer(request)
+    states = sorted(recipe_states(queryset, viewer))
+    digest = hashlib.sha256(repr((
+        request.scheme, request.get_host(),
+        viewer.pk if viewer is not None else None,
+        signature, states,
+    )).encode())
+    last_modified = max((state[1] for state in states), default=None)
+    return Validators(
+        quote_etag(digest.hexdigest()[:32]),
+        int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def filter_signature(request):
+    params = request.query_params
+    return tuple(sorted(
+        (name, value) for name in params for value in params.getlist(name)
+    ))
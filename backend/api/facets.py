@@ -0,0 +1,90 @@
+"""Фасеты списка рецептов: ?facets=tags.
+
+Число рецептов каждого тега считается по набору с текущими фильтрами,
+кроме самого фильтра по тегам: так интерфейс показывает, сколько
+рецептов останется при выборе тега. Все счётчики считаются одним
+сгруппированным запросом по промежуточной таблице и кешируются по
+набору фильтров. Без фильтров берутся готовые счётчики TagStat.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from rest_framework.exceptions import ValidationError
+
+from api.cache import (RECIPES_VERSION_KEY, catalog, get_version,
+                       viewer_version_key)
+from api.fieldsets import split
+from api.filters import RecipeFilter
+from api.projections import get_viewer
+from recipes import tagstats
+from recipes.models import Recipe
+
+FACETS = ('tags',)
+VIEWER_FILTERS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def requested_facets(request):
+    names = split(request.query_params.get('facets', ''))
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise ValidationError(
+            {'facets': f'Неизвестные фасеты: {", ".join(unknown)}.'}
+        )
+    return names
+
+
+def active_filters(request):
+    """Фильтры запроса, кроме тегов, которые сужают набор рецептов."""
+    data = request.query_params.copy()
+    data.pop('tags', None)
+    filterset = RecipeFilter(data, queryset=Recipe.objects.all(),
+                             request=request)
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    viewer = get_viewer(request)
+    active = {}
+    for name, value in filterset.form.cleaned_data.items():
+        if name == 'tags' or value in (None, False):
+            continue
+        if name in VIEWER_FILTERS and viewer is None:
+            continue
+        active[name] = getattr(value, 'pk', value)
+    return filterset, active
+
+
+def tag_counts(request):
+    filterset, active = active_filters(request)
+    if not active:
+        return tagstats.counts()
+    key = f'recipes:facets:tags:{get_version(RECIPES_VERSION_KEY)}'
+    if any(name in active for name in VIEWER_FILTERS):
+        # Избранное и корзина меняются без версии рецептов.
+        viewer = get_viewer(request)
+        key += (f':{viewer.pk}:'
+                f'{get_version(viewer_version_key(viewer.pk))}')
+    key += ':' + '&'.join(
+        f'{name}={value}' for name, value in sorted(active.items())
+    )
+    counts = cache.get(key)
+    if counts is None:
+        counts = dict(
+            tagstats.RecipeTag.objects
+            .filter(recipe__in=filterset.qs.values('pk'))
+            .order_by().values('tag_id')
+            .annotate(count=Count('recipe_id'))
+            .values_list('tag_id', 'count')
+        )
+        cache.set(key, counts, settings.RECIPE_FACETS_CACHE_TTL)
+    return counts
+
+
+def facets(request):
+    """{'tags': [...]} с полем count у каждого тега или {}."""
+    result = {}
+    if 'tags' in requested_facets(request):
+        counts = tag_counts(request)
+        result['tags'] = [
+            dict(tag, count=counts.get(tag['id'], 0))
+            for tag in catalog.get_tags()
+        ]
+    return result
@@ -0,0 +1,128 @@
+"""Лента рецептов от авторов, на которых подписан пользователь.
+
+Новый рецепт раскладывается по лентам подписчиков (fan-out on write).
+Рецепты авторов с числом подписчиков больше FEED_CELEBRITY_FOLLOWERS
+в ленты не пишутся и подмешиваются при чтении (fan-out on read).
+Множество таких авторов считается одним GROUP BY по Follow и кешируется
+на FEED_CELEBRITIES_TTL секунд.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from jobs.tasks import enqueue_on_commit, task
+from recipes.models import FeedItem, Recipe
+from users.models import Follow
+
+CELEBRITIES_KEY = 'feed:celebrities'
+
+
+def before(position, date_field, id_field):
+    """Условие «строго после позиции» при сортировке по убыванию."""
+    pub_date, pk = position
+    return (Q(**{f'{date_field}__lt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__lt': pk}))
+
+
+def is_celebrity(author_id):
+    followers = Follow.objects.filter(author_id=author_id)
+    celebrity = followers[settings.FEED_CELEBRITY_FOLLOWERS:].exists()
+    cached = cache.get(CELEBRITIES_KEY)
+    if cached is not None and (author_id in cached) != celebrity:
+        # Автор перешёл порог: читатели не должны ждать истечения кеша.
+        cache.delete(CELEBRITIES_KEY)
+    return celebrity
+
+
+def celebrities():
+    ids = cache.get(CELEBRITIES_KEY)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.order_by().values('author_id')
+            .annotate(followers=Count('id'))
+            .filter(followers__gt=settings.FEED_CELEBRITY_FOLLOWERS)
+            .values_list('author_id', flat=True)
+        )
+        cache.set(CELEBRITIES_KEY, ids, settings.FEED_CELEBRITIES_TTL)
+    return ids
+
+
+def celebrity_authors(user):
+    ids = celebrities()
+    if not ids:
+        return []
+    return list(
+        Follow.objects.filter(user=user, author_id__in=ids)
+        .values_list('author_id', flat=True)
+    )
+
+
+def write_feed(recipe_id, pub_date, follower_ids):
+    items = (FeedItem(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+             for user_id in follower_ids)
+    FeedItem.objects.bulk_create(items, batch_size=settings.FEED_BATCH_SIZE,
+                                 ignore_conflicts=True)
+
+
+@task
+def fan_out(recipe_id):
+    recipe = (Recipe.objects.filter(id=recipe_id)
+              .values('author_id', 'pub_date').first())
+    if recipe is None or is_celebrity(recipe['author_id']):
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=recipe['author_id'])
+        .values_list('user_id', flat=True)
+    )
+    write_feed(recipe_id, recipe['pub_date'], follower_ids)
+
+
+def publish(recipe):
+    """Раскладывает рецепт по лентам после фиксации транзакции.
+
+    Для авторов с большим числом подписчиков запись уходит в фоновую
+    задачу, чтобы не задерживать ответ.
+    """
+    followers = Follow.objects.filter(author_id=recipe.author_id)
+    if followers[settings.FEED_FANOUT_SYNC_LIMIT:].exists():
+        enqueue_on_commit(fan_out, recipe_id=recipe.id)
+    else:
+        transaction.on_commit(lambda: fan_out(recipe.id))
+
+
+def backfill(user, author):
+    """Добавляет в ленту последние рецепты нового автора из подписок."""
+    if is_celebrity(author.id):
+        return
+    recipes = (Recipe.objects.filter(author=author)
+               .order_by('-pub_date', '-id')
+               .values_list('id', 'pub_date')[:settings.FEED_BACKFILL])
+    FeedItem.objects.bulk_create(
+        (FeedItem(user=user, recipe_id=recipe_id, pub_date=pub_date)
+         for recipe_id, pub_date in recipes),
+        ignore_conflicts=True,
+    )
+
+
+def unfollow(user, author):
+    FeedItem.objects.filter(user=user, recipe__author=author).delete()
+
+
+def feed_positions(user, position, limit):
+    """Позиции (pub_date, recipe_id) ленты по убыванию, не больше limit."""
+    items = FeedItem.objects.filter(user=user)
+    if position is not None:
+        items = items.filter(before(position, 'pub_date', 'recipe_id'))
+    rows = list(items.order_by('-pub_date', '-recipe_id')
+                .values_list('pub_date', 'recipe_id')[:limit])
+    celebrities = celebrity_authors(user)
+    if not celebrities:
+        return rows
+    recipes = Recipe.objects.filter(author_id__in=celebrities)
+    if position is not None:
+        recipes = recipes.filter(before(position, 'pub_date', 'id'))
+    rows += recipes.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id'
+    )[:limit]
+    return sorted(set(rows), reverse=True)[:limit]
@@ -0,0 +1,60 @@
+"""Выборочные поля ответа: ?fields=id,name,author&expand=author.
+
+Без fields ответ полный, как раньше. С fields в ответе только
+перечисленные поля, а связи из них отдаются id, если не указаны в expand.
+Проекции и сериализаторы по FieldSet пропускают запросы за полями,
+которых нет в ответе.
+"""
+from rest_framework.exceptions import ValidationError
+
+RECIPE_FIELDS = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
+                 'is_in_shopping_cart', 'name', 'image', 'text',
+                 'cooking_time')
+RECIPE_RELATIONS = ('tags', 'author', 'ingredients')
+SUBSCRIPTION_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name',
+                       'recipes_count', 'recipes', 'is_subscribed')
+SUBSCRIPTION_RELATIONS = ('recipes',)
+
+
+def split(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class FieldSet:
+
+    def __init__(self, fields, relations, requested=None, expand=()):
+        self.fields = tuple(
+            field for field in fields
+            if requested is None or field in requested
+        )
+        self.expand = (set(relations) if requested is None
+                       else set(expand) & set(relations))
+
+    @classmethod
+    def from_request(cls, request, fields, relations):
+        params = getattr(request, 'query_params', {})
+        requested = params.get('fields')
+        requested = None if requested is None else split(requested)
+        expand = split(params.get('expand', ''))
+        unknown = ([name for name in requested or () if name not in fields]
+                   + [name for name in expand if name not in relations])
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Неизвестные поля: {", ".join(unknown)}.'}
+            )
+        return cls(fields, relations, requested, expand)
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def expanded(self, field):
+        return field in self.fields and field in self.expand
+
+
+def recipe_fieldset(request):
+    return FieldSet.from_request(request, RECIPE_FIELDS, RECIPE_RELATIONS)
+
+
+def subscription_fieldset(request):
+    return FieldSet.from_request(request, SUBSCRIPTION_FIELDS,
+                                 SUBSCRIPTION_RELATIONS)
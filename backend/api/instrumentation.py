@@ -0,0 +1,235 @@
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import Field
+from rest_framework.serializers import BaseSerializer
+
+_current_stats = ContextVar('request_stats', default=None)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+MAX_ORIGIN_DEPTH = 80
+
+
+def get_current_stats():
+    return _current_stats.get()
+
+
+def query_fingerprint(sql):
+    # Запросы приходят уже параметризованными, схлопываем только IN (...).
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def field_path(field):
+    names = []
+    while field is not None:
+        if field.field_name:
+            names.append(field.field_name)
+        if field.parent is None:
+            root = getattr(field, 'child', field)
+            names.append(type(root).__name__)
+        field = field.parent
+    return '.'.join(reversed(names))
+
+
+def serializer_field_origin(frame=None):
+    """Имя поля сериализатора, внутри которого выполняется запрос."""
+    frame = frame or sys._getframe(1)
+    fallback = None
+    depth = 0
+    while frame is not None and depth < MAX_ORIGIN_DEPTH:
+        obj = frame.f_locals.get('self')
+        if isinstance(obj, Field):
+            if not isinstance(obj, BaseSerializer):
+                return field_path(obj)
+            if fallback is None:
+                fallback = obj
+        frame = frame.f_back
+        depth += 1
+    return field_path(fallback) if fallback is not None else None
+
+
+class RequestStats:
+
+    def __init__(self, duplicate_threshold=2):
+        self.started = time.perf_counter()
+        self.view = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.duplicate_threshold = duplicate_threshold
+        self.fingerprints = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            key = query_fingerprint(sql)
+            self.fingerprints[key] += 1
+            if self.fingerprints[key] == self.duplicate_threshold:
+                self.origins[key] = serializer_field_origin()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def duplicates(self, threshold):
+        return [
+            (sql, count, self.origins.get(sql))
+            for sql, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+
+@contextmanager
+def collect_queries(stats):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        yield stats
+
+
+@contextmanager
+def request_stats(stats, queries=True):
+    token = _current_stats.set(stats)
+    try:
+        if queries:
+            with collect_queries(stats):
+                yield stats
+        else:
+            yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def track_serialization():
+    """Учитывает время сериализации верхнего уровня в RequestStats."""
+    stats = _current_stats.get()
+    if stats is None or stats.serializer_depth:
+        yield
+        return
+    stats.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_depth -= 1
+        stats.serializer_time += time.perf_counter() - start
+
+
+class TimedSerializerMixin:
+
+    def to_representation(self, instance):
+        with track_serialization():
+            return super().to_representation(instance)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class StatsRegistry:
+    """Скользящая агрегация метрик по представлениям внутри процесса."""
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._totals = defaultdict(Counter)
+
+    def add(self, view, wall, queries, db_time, serializer_time, size):
+        with self._lock:
+            self._samples[view].append(
+                (wall, queries, db_time, serializer_time, size)
+            )
+            totals = self._totals[view]
+            totals['requests'] += 1
+            totals['seconds'] += wall
+            totals['queries'] += queries
+            totals['db_seconds'] += db_time
+            totals['serializer_seconds'] += serializer_time
+            totals['bytes'] += size
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def snapshot(self):
+        with self._lock:
+            samples = {
+                view: list(rows) for view, rows in self._samples.items()
+            }
+            totals = {view: dict(row) for view, row in self._totals.items()}
+        report = []
+        for view, rows in samples.items():
+            walls = [row[0] for row in rows]
+            count = len(rows)
+            report.append({
+                'view': view,
+                'requests': totals[view]['requests'],
+                'window': count,
+                'p50_ms': round(percentile(walls, 0.5) * 1000, 2),
+                'p95_ms': round(percentile(walls, 0.95) * 1000, 2),
+                'max_ms': round(max(walls) * 1000, 2),
+                'avg_queries': round(sum(r[1] for r in rows) / count, 2),
+                'max_queries': max(r[1] for r in rows),
+                'avg_db_ms': round(sum(r[2] for r in rows) / count * 1000, 2),
+                'avg_serializer_ms': round(
+                    sum(r[3] for r in rows) / count * 1000, 2
+                ),
+                'avg_bytes': round(sum(r[4] for r in rows) / count),
+            })
+        report.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return report
+
+    def prometheus(self):
+        with self._lock:
+            totals = {view: dict(row) for view, row in self._totals.items()}
+        metrics = (
+            ('requests', 'foodgram_view_requests_total',
+             'Обработано запросов.'),
+            ('seconds', 'foodgram_view_seconds_total',
+             'Суммарное время обработки, с.'),
+            ('queries', 'foodgram_view_db_queries_total',
+             'Выполнено SQL-запросов.'),
+            ('db_seconds', 'foodgram_view_db_seconds_total',
+             'Суммарное время SQL-запросов, с.'),
+            ('serializer_seconds', 'foodgram_view_serializer_seconds_total',
+             'Суммарное время сериализации, с.'),
+            ('bytes', 'foodgram_view_response_bytes_total',
+             'Отдано байт в теле ответа.'),
+        )
+        lines = []
+        for key, name, description in metrics:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for view in sorted(totals):
+                value = totals[view].get(key, 0)
+                lines.append(f'{name}{{view="{view}"}} {value}')
+        name = 'foodgram_view_p95_seconds'
+        lines.append(f'# HELP {name} 95-й перцентиль в скользящем окне, с.')
+        lines.append(f'# TYPE {name} gauge')
+        for row in sorted(self.snapshot(), key=lambda row: row['view']):
+            lines.append(f'{name}{{view="{row["view"]}"}} '
+                         f'{row["p95_ms"] / 1000}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = StatsRegistry(window=settings.REQUEST_STATS_WINDOW)
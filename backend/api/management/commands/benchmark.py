@@ -0,0 +1,198 @@
+import base64
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import django
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.instrumentation import RequestStats, collect_queries, percentile
+from api.management.commands.generate_data import PLACEHOLDER_IMAGE
+from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+IMAGE = 'data:image/gif;base64,' + base64.b64encode(PLACEHOLDER_IMAGE).decode()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'), capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет основные эндпоинты в процессе и выводит '
+            'перцентили задержек и число SQL-запросов в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--email',
+                            help='Пользователь, от имени которого идут '
+                                 'запросы (по умолчанию — с наибольшим '
+                                 'числом подписок).')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Запустить только указанные сценарии.')
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['email'])
+        self.created = []
+        self.client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        scenarios = self.get_scenarios(user)
+        selected = options['scenarios']
+        if selected:
+            unknown = set(selected) - {name for name, *_ in scenarios}
+            if unknown:
+                raise CommandError(f'Неизвестные сценарии: {unknown}')
+            scenarios = [row for row in scenarios if row[0] in selected]
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            results = {
+                name: self.run_scenario(method, path, payload,
+                                        options['iterations'],
+                                        options['warmup'])
+                for name, method, path, payload in scenarios
+            }
+            self.cleanup()
+        report = {
+            'meta': self.get_meta(user),
+            'scenarios': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    @staticmethod
+    def get_user(email):
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            user = (User.objects.annotate(follows=Count('follower'))
+                    .order_by('-follows', 'id').first())
+        if user is None:
+            raise CommandError('Нет пользователей, запустите generate_data.')
+        return user
+
+    def get_scenarios(self, user):
+        recipe = Recipe.objects.order_by('-id').first()
+        if recipe is None:
+            raise CommandError('Нет рецептов, запустите generate_data.')
+        author_id = (Recipe.objects.values('author')
+                     .annotate(total=Count('id')).order_by('-total')
+                     .first()['author'])
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        tag_query = '&'.join(f'tags={slug}' for slug in tags)
+        prefix = Ingredient.objects.values_list('name', flat=True)[0][:2]
+        self.payload = payload = {
+            'name': 'Benchmark',
+            'text': 'Рецепт для нагрузочного теста.',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'ingredients': [
+                {'id': ingredient, 'amount': 10} for ingredient in
+                Ingredient.objects.values_list('id', flat=True)[:8]
+            ],
+        }
+        return [
+            ('recipe_list', 'get', '/api/recipes/', None),
+            ('recipe_list_tags', 'get', f'/api/recipes/?{tag_query}', None),
+            ('recipe_list_author', 'get',
+             f'/api/recipes/?author={author_id}', None),
+            ('recipe_list_favorited', 'get',
+             '/api/recipes/?is_favorited=1', None),
+            ('recipe_list_in_cart', 'get',
+             '/api/recipes/?is_in_shopping_cart=1', None),
+            ('recipe_list_limit_50', 'get', '/api/recipes/?limit=50', None),
+            ('recipe_detail', 'get', f'/api/recipes/{recipe.id}/', None),
+            ('subscriptions', 'get',
+             '/api/users/subscriptions/?recipes_limit=3', None),
+            ('download_shopping_cart', 'get',
+             '/api/recipes/download_shopping_cart/', None),
+            ('ingredient_search', 'get',
+             f'/api/ingredients/?name={prefix}', None),
+            ('recipe_create', 'post', '/api/recipes/', payload),
+            ('recipe_update', 'patch', self.recipe_update_path, payload),
+        ]
+
+    def recipe_update_path(self):
+        if not self.created:
+            response = self.client.post('/api/recipes/', self.payload,
+                                        format='json')
+            self.created.append(response.json()['id'])
+        return f'/api/recipes/{self.created[-1]}/'
+
+    def run_scenario(self, method, path, payload, iterations, warmup):
+        request = getattr(self.client, method)
+        latencies, queries, sizes, statuses = [], [], [], set()
+        for number in range(warmup + iterations):
+            url = path() if callable(path) else path
+            kwargs = {'format': 'json'} if payload else {}
+            with collect_queries(RequestStats()) as stats:
+                started = time.perf_counter()
+                response = request(url, payload, **kwargs)
+                if response.streaming:
+                    content = b''.join(response.streaming_content)
+                else:
+                    content = response.content
+                elapsed = time.perf_counter() - started
+            if method == 'post' and response.status_code == 201:
+                self.created.append(response.json()['id'])
+            if number < warmup:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(stats.queries)
+            sizes.append(len(content))
+            statuses.add(response.status_code)
+        return {
+            'iterations': iterations,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p90_ms': round(percentile(latencies, 0.9), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'mean_ms': round(statistics.mean(latencies), 2),
+            'min_ms': round(min(latencies), 2),
+            'max_ms': round(max(latencies), 2),
+            'queries': round(statistics.median(queries)),
+            'max_queries': max(queries),
+            'bytes': round(statistics.median(sizes)),
+        }
+
+    def cleanup(self):
+        Recipe.objects.filter(id__in=self.created).delete()
+
+    @staticmethod
+    def get_meta(user):
+        return {
+            'revision': git_revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'user': user.email,
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredient_amounts': IngredientAmount.objects.count(),
+                'follows': Follow.objects.count(),
+                'favorites': Favorite.objects.count(),
+                'shopping_carts': ShoppingCart.objects.count(),
+            },
+        }
@@ -0,0 +1,72 @@
+import time
+
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.compression import CODECS
+
+URLS = ('/api/recipes/?limit={size}', '/api/ingredients/')
+
+
+def compression_time(codec, content, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        codec.compress(content)
+    return (time.process_time() - started) / repeat
+
+
+def cpu_per_request(client, url, encoding, repeat, cold):
+    total = 0.0
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        started = time.process_time()
+        response = client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+        total += time.process_time() - started
+    return response, total / repeat
+
+
+class Command(BaseCommand):
+    help = ('Размер ответа и процессорное время запроса без сжатия, с gzip '
+            'и brotli: с пустым и заполненным кешем, а также время одного '
+            'сжатия, которое экономит кеш сжатых ответов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', default='6,50,200')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        codecs = {codec.name: codec for codec in CODECS}
+        self.stdout.write(f'{"URL":<28} {"сжатие":<9} {"байт":>9} '
+                          f'{"мс, холодный":>13} {"мс, кеш":>9} '
+                          f'{"мс, сжатие":>11}')
+        urls = [url.format(size=size) for url in URLS
+                for size in options['page_sizes'].split(',')]
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for url in dict.fromkeys(urls):
+                content = client.get(url).content
+                for encoding in ['identity', *codecs]:
+                    response, cold = cpu_per_request(
+                        client, url, encoding, options['repeat'], cold=True
+                    )
+                    if response.status_code != 200:
+                        raise CommandError(
+                            f'{url}: ответ {response.status_code}.'
+                        )
+                    _, warm = cpu_per_request(
+                        client, url, encoding, options['repeat'], cold=False
+                    )
+                    codec = codecs.get(encoding)
+                    compress = (0.0 if codec is None else compression_time(
+                        codec, content, options['repeat']
+                    ))
+                    self.stdout.write(
+                        f'{url:<28} '
+                        f'{response.get("Content-Encoding", encoding):<9} '
+                        f'{len(response.content):>9} '
+                        f'{cold * 1000:>13.2f} {warm * 1000:>9.2f} '
+                        f'{compress * 1000:>11.2f}'
+                    )
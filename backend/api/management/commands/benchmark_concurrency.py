@@ -0,0 +1,144 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from api.instrumentation import percentile
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_tree_rss(pid):
+    """Суммарный RSS процесса и его потомков, КБ (Linux /proc)."""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as file:
+                parents[int(entry)] = int(file.read().rsplit(')', 1)[1]
+                                          .split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, queue = {pid}, [pid]
+    while queue:
+        current = queue.pop()
+        for child, parent in parents.items():
+            if parent == current and child not in tree:
+                tree.add(child)
+                queue.append(child)
+    total = 0
+    for member in tree:
+        try:
+            with open(f'/proc/{member}/status') as file:
+                for line in file:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return total
+
+
+def fetch(url):
+    started = time.perf_counter()
+    try:
+        with urlopen(url, timeout=60) as response:
+            response.read()
+            status = response.status
+    except HTTPError as error:
+        status = error.code
+    return time.perf_counter() - started, status
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность синхронных и ASGI-воркеров '
+            'gunicorn при одинаковом числе процессов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/recipes/')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            choices=('wsgi', 'asgi'))
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        results = {
+            profile: self.run_profile(profile, options)
+            for profile in options['profiles'] or ('wsgi', 'asgi')
+        }
+        output = json.dumps(
+            {'path': options['path'], 'workers': options['workers'],
+             'concurrency': options['concurrency'], 'results': results},
+            ensure_ascii=False, indent=2,
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def run_profile(self, profile, options):
+        port = free_port()
+        env = os.environ.copy()
+        env.update({
+            'GUNICORN_PROFILE': profile,
+            'GUNICORN_WORKERS': str(options['workers']),
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            'Hosts': '127.0.0.1',
+        })
+        server = subprocess.Popen(
+            (sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'),
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        url = f'http://127.0.0.1:{port}{options["path"]}'
+        try:
+            self.wait_ready(server, url)
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                list(pool.map(fetch, [url] * options['concurrency']))
+                rss = process_tree_rss(server.pid)
+                started = time.perf_counter()
+                rows = list(pool.map(fetch, [url] * options['requests']))
+                elapsed = time.perf_counter() - started
+            rss = max(rss, process_tree_rss(server.pid))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        latencies = [row[0] * 1000 for row in rows]
+        rps = len(rows) / elapsed
+        return {
+            'status': sorted({row[1] for row in rows}),
+            'requests_per_second': round(rps, 1),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'mean_ms': round(statistics.mean(latencies), 2),
+            'rss_mb': round(rss / 1024, 1),
+            'requests_per_second_per_100mb': round(rps / rss * 1024 * 100, 1),
+        }
+
+    @staticmethod
+    def wait_ready(server, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('gunicorn завершился при запуске.')
+            try:
+                fetch(url)
+                return
+            except (URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError('gunicorn не ответил за отведённое время.')
@@ -0,0 +1,100 @@
+import json
+import math
+import time
+from io import BytesIO
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+
+# Значения, которые orjson и json кодируют по-разному.
+EDGE_CASES = (
+    {'value': 1e-05},
+    {'value': 1e+16},
+    {'values': [0.1, 1.5, -0.0, 123456789.125]},
+    {'nested': [{'score': 0.333}]},
+    {'value': math.nan},
+    {'value': math.inf},
+)
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает стандартный и быстрый JSON-рендерер на страницах '
+            'рецептов и проверяет побайтовое совпадение результата.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', default='6,50,200')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        self.compare_edge_cases()
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = AnonymousUser()
+        results = {'orjson': orjson is not None, 'pages': []}
+        for size in map(int, options['page_sizes'].split(',')):
+            recipes = Recipe.objects.all()[:size]
+            data = {
+                'count': size, 'next': None, 'previous': None,
+                'results': RecipeReadSerializer(
+                    recipes, many=True, context={'request': request}
+                ).data,
+            }
+            results['pages'].append(
+                self.compare(size, data, options['repeat'])
+            )
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def render(renderer, data):
+        try:
+            return renderer.render(data)
+        except ValueError as error:
+            return f'ValueError: {error}'
+
+    def compare_edge_cases(self):
+        for data in EDGE_CASES:
+            expected = self.render(JSONRenderer(), data)
+            if self.render(FastJSONRenderer(), data) != expected:
+                raise CommandError(
+                    f'Вывод рендереров различается: {data!r}.'
+                )
+
+    @staticmethod
+    def compare(size, data, repeat):
+        default, fast = JSONRenderer(), FastJSONRenderer()
+        expected = default.render(data)
+        if fast.render(data) != expected:
+            raise CommandError(f'Вывод рендереров различается: {size}.')
+        parsed = JSONParser().parse(BytesIO(expected))
+        if FastJSONParser().parse(BytesIO(expected)) != parsed:
+            raise CommandError(f'Результат парсеров различается: {size}.')
+        timings = {
+            'render_default_ms': best_time(
+                lambda: default.render(data), repeat),
+            'render_fast_ms': best_time(lambda: fast.render(data), repeat),
+            'parse_default_ms': best_time(
+                lambda: JSONParser().parse(BytesIO(expected)), repeat),
+            'parse_fast_ms': best_time(
+                lambda: FastJSONParser().parse(BytesIO(expected)), repeat),
+        }
+        return {
+            'page_size': size,
+            'bytes': len(expected),
+            **{key: round(value * 1000, 3) for key, value in timings.items()},
+        }
@@ -0,0 +1,145 @@
+import os
+import posixpath
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from recipes.models import Recipe, StoredFile
+
+storage = Recipe._meta.get_field('image').storage
+
+
+def iter_files(prefix):
+    """Потоково обходит хранилище, отдавая пары (имя, mtime)."""
+    if hasattr(storage, 'path'):
+        stack = [prefix]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = os.scandir(storage.path(directory))
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    name = posixpath.join(directory, entry.name)
+                    if name == settings.MEDIA_QUARANTINE_DIR:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(name)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield name, entry.stat().st_mtime
+        return
+    stack = [prefix]
+    while stack:
+        directory = stack.pop()
+        directories, files = storage.listdir(directory)
+        stack.extend(
+            posixpath.join(directory, name) for name in directories
+            if posixpath.join(directory, name) != settings.MEDIA_QUARANTINE_DIR
+        )
+        for name in files:
+            name = posixpath.join(directory, name)
+            yield name, storage.get_modified_time(name).timestamp()
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Находит файлы картинок рецептов, на которые не ссылается ни '
+            'один рецепт, и удаляет их или переносит в карантин.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='recipes/images')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Не трогать файлы моложе указанного '
+                                 'возраста.')
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument('--delete', action='store_true')
+        action.add_argument('--quarantine', action='store_true',
+                            help='Переместить в MEDIA_QUARANTINE_DIR.')
+        parser.add_argument('--fix-references', action='store_true',
+                            help='Пересчитать счётчики ссылок StoredFile.')
+
+    def handle(self, *args, **options):
+        deadline = time.time() - options['grace_hours'] * 3600
+        stats = dict.fromkeys(('scanned', 'orphans', 'young', 'removed',
+                               'references_fixed'), 0)
+        for batch in batches(iter_files(options['prefix']),
+                             options['batch_size']):
+            stats['scanned'] += len(batch)
+            names = [name for name, _ in batch]
+            referenced = dict(
+                Recipe.objects.filter(image__in=names).order_by()
+                .values_list('image').annotate(total=Count('id'))
+            )
+            if options['fix_references']:
+                stats['references_fixed'] += self.fix_references(referenced)
+            retained = set(
+                StoredFile.objects.filter(name__in=names, references__gt=0)
+                .values_list('name', flat=True)
+            )
+            for name, modified in batch:
+                if name in referenced or name in retained:
+                    continue
+                stats['orphans'] += 1
+                if modified > deadline:
+                    stats['young'] += 1
+                    continue
+                if options['delete']:
+                    removed = self.remove(name, storage.delete)
+                elif options['quarantine']:
+                    removed = self.remove(name, self.quarantine)
+                else:
+                    self.stdout.write(name)
+                    continue
+                stats['removed'] += removed
+        self.stdout.write(', '.join(
+            f'{key}: {value}' for key, value in stats.items()
+        ))
+
+    @staticmethod
+    def fix_references(referenced):
+        fixed = 0
+        records = StoredFile.objects.filter(name__in=referenced)
+        for record in records:
+            if record.references != referenced[record.name]:
+                record.references = referenced[record.name]
+                record.save(update_fields=('references',))
+                fixed += 1
+        return fixed
+
+    @staticmethod
+    def remove(name, action):
+        """Применяет action к сироте, если ссылки не появились за обход."""
+        with transaction.atomic():
+            record = StoredFile.objects.select_for_update().filter(
+                name=name
+            ).first()
+            if record is not None and record.references > 0:
+                return False
+            if Recipe.objects.filter(image=name).exists():
+                return False
+            if record is not None:
+                record.delete()
+            action(name)
+        return True
+
+    @staticmethod
+    def quarantine(name):
+        target = storage.path(
+            posixpath.join(settings.MEDIA_QUARANTINE_DIR, name)
+        )
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(storage.path(name), target)
@@ -0,0 +1,175 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from scipy import sparse
+
+from recipes.models import (Favorite, ShoppingCart, SimilarRecipe,
+                            Watermark)
+
+
+def load_interactions(sources):
+    """Пары (user_id, recipe_id, вес) из всех источников одним массивом."""
+    rows = []
+    for model, weight in sources:
+        pairs = np.fromiter(
+            (value for pair in model.objects.values_list('user_id',
+                                                         'recipe_id')
+             .order_by().iterator() for value in pair),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        rows.append(np.column_stack(
+            (pairs, np.full(len(pairs), weight, dtype=np.float64))
+        ))
+    return np.concatenate(rows) if rows else np.empty((0, 3))
+
+
+def stale_links(sources):
+    """Связи рецептов, которых нет ни в одном источнике, то есть в матрице."""
+    links = SimilarRecipe.objects.all()
+    for model, _ in sources:
+        links = links.filter(
+            ~Exists(model.objects.filter(recipe_id=OuterRef('recipe_id')))
+        )
+    return links
+
+
+def item_matrix(interactions):
+    """Нормированная разреженная матрица рецепт × пользователь."""
+    users, user_index = np.unique(interactions[:, 0].astype(np.int64),
+                                  return_inverse=True)
+    recipes, recipe_index = np.unique(interactions[:, 1].astype(np.int64),
+                                      return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (interactions[:, 2], (recipe_index, user_index)),
+        shape=(len(recipes), len(users)),
+    )
+    # Повторы (избранное и корзина одного пользователя) складываются.
+    matrix.sum_duplicates()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix, recipes
+
+
+def top_neighbours(similarity, own, k, min_score):
+    """Для каждой строки блока — k лучших соседей без самого рецепта.
+
+    own[row] — столбец самого рецепта строки row.
+    """
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        columns = similarity.indices[start:end]
+        scores = similarity.data[start:end]
+        keep = (columns != own[row]) & (scores >= min_score)
+        columns, scores = columns[keep], scores[keep]
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+            columns, scores = columns[best], scores[best]
+        yield row, columns, scores
+
+
+class Command(BaseCommand):
+    help = ('Считает похожие рецепты по совместному добавлению в избранное '
+            '(item-item косинусная близость) и сохраняет top-k соседей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int,
+                            default=settings.SIMILAR_RECIPES_TOP_K)
+        parser.add_argument('--min-score', type=float, default=0.0)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--with-carts', action='store_true',
+                            help='Учитывать список покупок.')
+        parser.add_argument('--carts-weight', type=float, default=0.5)
+        parser.add_argument('--incremental', action='store_true',
+                            help='Пересчитать только рецепты пользователей '
+                                 'с новыми добавлениями.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        sources = [(Favorite, 1.0)]
+        if options['with_carts']:
+            sources.append((ShoppingCart, options['carts_weight']))
+        watermarks = {
+            model: Watermark.objects.get_or_create(
+                name=f'similar:{model._meta.model_name}'
+            )[0]
+            for model, _ in sources
+        }
+        latest = {
+            model: model.objects.aggregate(last=Max('id'))['last'] or 0
+            for model, _ in sources
+        }
+        interactions = load_interactions(sources)
+        if not len(interactions):
+            if not options['incremental']:
+                SimilarRecipe.objects.all().delete()
+            self.stdout.write('Нет данных для расчёта.')
+            return
+        matrix, recipe_ids = item_matrix(interactions)
+        targets = np.arange(len(recipe_ids))
+        if options['incremental']:
+            targets = self.changed_rows(sources, watermarks, recipe_ids)
+        transposed = matrix.T.tocsc()
+        written = 0
+        for start in range(0, len(targets), options['chunk_size']):
+            rows = targets[start:start + options['chunk_size']]
+            similarity = (matrix[rows] @ transposed).tocsr()
+            # Полный пересчёт заодно убирает соседей рецептов вне матрицы.
+            stale = (None if options['incremental'] or start
+                     else stale_links(sources))
+            written += self.store(similarity, rows, recipe_ids, options,
+                                  stale)
+        for model, watermark in watermarks.items():
+            watermark.last_id = latest[model]
+            watermark.save(update_fields=('last_id',))
+        self.stdout.write(
+            f'Рецептов: {len(recipe_ids)}, пересчитано: {len(targets)}, '
+            f'связей записано: {written}, '
+            f'{time.perf_counter() - started:.1f} с'
+        )
+
+    @staticmethod
+    def changed_rows(sources, watermarks, recipe_ids):
+        """Строки рецептов, у которых могли измениться соседи.
+
+        Новое добавление (u, r) меняет близость r со всеми рецептами u,
+        поэтому пересчитываются все рецепты затронутых пользователей.
+        Удаления из избранного учитывает только полный пересчёт.
+        """
+        users = set()
+        for model, _ in sources:
+            users.update(
+                model.objects.filter(id__gt=watermarks[model].last_id)
+                .values_list('user_id', flat=True)
+            )
+        changed = set()
+        for model, _ in sources:
+            changed.update(
+                model.objects.filter(user_id__in=users)
+                .values_list('recipe_id', flat=True)
+            )
+        return np.flatnonzero(np.isin(recipe_ids, list(changed)))
+
+    @staticmethod
+    def store(similarity, rows, recipe_ids, options, stale=None):
+        links = []
+        for row, columns, scores in top_neighbours(
+            similarity, rows, options['top_k'], options['min_score']
+        ):
+            links.extend(
+                SimilarRecipe(recipe_id=int(recipe_ids[rows[row]]),
+                              neighbour_id=int(recipe_ids[column]),
+                              score=float(score))
+                for column, score in zip(columns, scores)
+            )
+        with transaction.atomic():
+            if stale is not None:
+                stale.delete()
+            SimilarRecipe.objects.filter(
+                recipe_id__in=recipe_ids[rows].tolist()
+            ).delete()
+            SimilarRecipe.objects.bulk_create(links, batch_size=1000)
+        return len(links)
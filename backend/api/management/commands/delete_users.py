@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from recipes.deletion import delete_users
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Удаляет пользователей с рецептами и связанными данными '
+            'пачками, печатая прогресс по таблицам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='*')
+        parser.add_argument('--id', dest='ids', type=int, action='append',
+                            default=[])
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.DELETION_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not options['emails'] and not options['ids']:
+            raise CommandError('Укажите email или --id пользователей.')
+        users = User.objects.filter(email__in=options['emails']) | (
+            User.objects.filter(pk__in=options['ids'])
+        )
+        stats = delete_users(
+            users, options['batch_size'],
+            progress=lambda label, deleted: self.stdout.write(
+                f'{label}: {deleted}'
+            ),
+        )
+        if not stats:
+            raise CommandError('Пользователи не найдены.')
+        self.stdout.write(self.style.SUCCESS('Удалено: {}'.format(
+            ', '.join(f'{label} — {count}' for label, count in stats.items())
+        )))
@@ -0,0 +1,115 @@
+import re
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import Follow, User
+
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+).*?rows=(\d+)')
+ACTUAL_ROWS = re.compile(r'actual time=[\d.]+\.\.[\d.]+ rows=(\d+)')
+EXECUTION_TIME = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+def canonical_queries(user, author, tag, prefix, page_size):
+    """Запросы в том виде, в каком их строят представления API."""
+    recipes = Recipe.objects.values_list('id', flat=True)
+    return {
+        'recipes': recipes[:page_size],
+        'recipes_author': recipes.filter(author=author)[:page_size],
+        'recipes_tags': recipes.filter(
+            tags__slug__in=[tag]
+        ).distinct()[:page_size],
+        'recipes_favorited': recipes.filter(
+            favorites__user=user
+        )[:page_size],
+        'recipes_in_cart': recipes.filter(userscarts__user=user)[:page_size],
+        'ingredients_prefix': Ingredient.objects.filter(
+            name__istartswith=prefix
+        ),
+        'subscriptions': User.objects.filter(
+            following__user=user
+        )[:page_size],
+        'subscription_recipes': Recipe.objects.filter(
+            author__following__user=user
+        ).values('author_id', 'id', 'name', 'image', 'cooking_time'),
+        'followers': Follow.objects.filter(author=author).values_list(
+            'user_id', flat=True
+        ),
+        'shopping_cart': Recipe.shopping_cart_ingredients(user),
+    }
+
+
+def parse_plan(plan):
+    """Последовательные сканирования и время выполнения из текста плана."""
+    scans = []
+    for line in plan.splitlines():
+        match = SEQ_SCAN.search(line)
+        if match is None:
+            continue
+        rows = int(match.group(2))
+        actual = ACTUAL_ROWS.search(line)
+        if actual is not None:
+            rows = max(rows, int(actual.group(1)))
+        scans.append((match.group(1), rows))
+    time = EXECUTION_TIME.search(plan)
+    return scans, float(time.group(1)) if time else None
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет типовые запросы API через EXPLAIN (ANALYZE, BUFFERS) '
+            'и отмечает последовательные сканирования больших таблиц.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=int, default=1000,
+                            help='Порог строк для Seq Scan.')
+        parser.add_argument('--query', action='append', dest='queries')
+        parser.add_argument('--prefix', default='а')
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--verbose-plans', action='store_true')
+        parser.add_argument('--strict', action='store_true',
+                            help='Завершиться с ошибкой при находках.')
+
+    def handle(self, *args, **options):
+        user, author, tag = self.sample_objects()
+        queries = canonical_queries(user, author, tag, options['prefix'],
+                                    options['page_size'])
+        postgres = connection.vendor == 'postgresql'
+        if not postgres:
+            self.stderr.write('ANALYZE и BUFFERS доступны только в '
+                              'PostgreSQL, показан обычный план.')
+        flagged = []
+        for name, queryset in queries.items():
+            if options['queries'] and name not in options['queries']:
+                continue
+            plan = (queryset.explain(analyze=True, buffers=True)
+                    if postgres else queryset.explain())
+            scans, time = parse_plan(plan)
+            large = [(table, rows) for table, rows in scans
+                     if rows >= options['threshold']]
+            timing = f'{time:.2f} мс' if time is not None else '-'
+            self.stdout.write(f'{name}: {timing}')
+            for table, rows in large:
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING(
+                    f'  Seq Scan on {table}: {rows} строк'
+                ))
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+        if flagged and options['strict']:
+            raise CommandError(
+                'Последовательные сканирования: ' + ', '.join(flagged)
+            )
+
+    @staticmethod
+    def sample_objects():
+        """Самые активные пользователь и автор: худший случай для планов."""
+        user = (User.objects.annotate(total=Count('follower'))
+                .order_by('-total').first())
+        author = (User.objects.annotate(total=Count('recipes'))
+                  .order_by('-total').first())
+        if user is None:
+            raise CommandError('В базе нет пользователей.')
+        tag = Tag.objects.values_list('slug', flat=True).first() or ''
+        return user, author, tag
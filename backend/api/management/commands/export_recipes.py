@@ -0,0 +1,41 @@
+import sys
+import time
+
+from django.core.management import BaseCommand
+
+from recipes.exchange import export_recipes
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в NDJSON (по рецепту на строку).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-',
+                            help='Файл, по умолчанию stdout.')
+        parser.add_argument('--author', help='Только рецепты автора (email).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--embed-images', action='store_true',
+                            help='Встроить картинки в base64.')
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['author']:
+            queryset = queryset.filter(author__email=options['author'])
+        started = time.perf_counter()
+        output = (sys.stdout.buffer if options['output'] == '-'
+                  else open(options['output'], 'wb'))
+        count = 0
+        try:
+            for line in export_recipes(queryset, options['batch_size'],
+                                       options['embed_images']):
+                output.write(line)
+                count += 1
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        elapsed = time.perf_counter() - started
+        self.stderr.write(
+            f'Выгружено рецептов: {count} за {elapsed:.2f} с '
+            f'({count / elapsed if elapsed else 0:.0f} строк/с)'
+        )
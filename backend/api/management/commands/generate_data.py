@@ -0,0 +1,197 @@
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+
+from recipes import changelog, tagstats
+from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                            RecipeChange, ShoppingCart, Tag)
+from users.models import Follow, User
+
+# Минимальный валидный GIF 1x1, одна картинка на все синтетические рецепты:
+# хранилище ведёт по ссылке на каждый рецепт.
+PLACEHOLDER_IMAGE = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04'
+    b'\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D'
+    b'\x01\x00;'
+)
+
+
+def zipf_weights(size, exponent, rng):
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+def sample_pairs(sources, targets, per_source, cum_weights, rng,
+                 allow_same=True):
+    """Пары (источник, цель), цели выбираются по степенному закону."""
+    pairs = set()
+    if per_source <= 0 or not targets:
+        return pairs
+    for source in sources:
+        count = min(len(targets), int(rng.expovariate(1 / per_source)))
+        if not count:
+            continue
+        for target in rng.choices(targets, cum_weights=cum_weights, k=count):
+            if allow_same or source != target:
+                pairs.add((source, target))
+    return pairs
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетический набор данных для нагрузочных тестов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes-per-user', type=float, default=5)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--follows-per-user', type=float, default=10)
+        parser.add_argument('--favorites-per-user', type=float, default=20)
+        parser.add_argument('--carts-per-user', type=float, default=3)
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Показатель степенного распределения.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default='synthetic')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--flush', action='store_true',
+                            help='Удалить ранее созданных пользователей.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=f'{prefix}_')
+        if existing.exists():
+            if not options['flush']:
+                raise CommandError(
+                    f'Пользователи с префиксом {prefix} уже есть, '
+                    f'используйте --flush.'
+                )
+            existing.delete()
+        self.ensure_catalog()
+        started = time.perf_counter()
+        with transaction.atomic():
+            user_ids = self.create_users(prefix, options['users'])
+            recipe_ids = self.create_recipes(
+                prefix, user_ids, options['recipes_per_user'],
+                options['exponent'],
+            )
+            self.create_ingredients(recipe_ids,
+                                    options['ingredients_per_recipe'])
+            self.create_tags(recipe_ids)
+            self.create_links(user_ids, recipe_ids, options)
+            changelog.record(recipe_ids, RecipeChange.CREATED)
+            changelog.recipes_created.send(sender=Recipe, ids=recipe_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано {len(user_ids)} пользователей и {len(recipe_ids)} '
+            f'рецептов за {time.perf_counter() - started:.1f} с.'
+        ))
+
+    def ensure_catalog(self):
+        if not Ingredient.objects.exists():
+            call_command('import_database')
+        if not Tag.objects.exists():
+            call_command('import_database_tags')
+
+    def create_users(self, prefix, count):
+        password = make_password(prefix)
+        User.objects.bulk_create(
+            (
+                User(username=f'{prefix}_{number}',
+                     email=f'{prefix}_{number}@example.com',
+                     first_name='Синтетический', last_name='Пользователь',
+                     password=password)
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        return list(
+            User.objects.filter(username__startswith=f'{prefix}_')
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def create_recipes(self, prefix, user_ids, per_user, exponent):
+        total = int(len(user_ids) * per_user)
+        if not total:
+            return []
+        image = default_storage.save(
+            f'recipes/images/{prefix}.gif', ContentFile(PLACEHOLDER_IMAGE)
+        )
+        retain = getattr(default_storage, 'retain', None)
+        if retain is not None and total > 1:
+            # save() уже добавил одну ссылку.
+            retain(image, total - 1)
+        authors = self.rng.choices(
+            user_ids, cum_weights=zipf_weights(len(user_ids), exponent,
+                                               self.rng),
+            k=total,
+        )
+        Recipe.objects.bulk_create(
+            (
+                Recipe(author_id=author, name=f'Recipe {number}',
+                       text='Синтетический рецепт. ' * 20, image=image,
+                       cooking_time=self.rng.randint(5, 180))
+                for number, author in enumerate(authors)
+            ),
+            batch_size=self.batch_size,
+        )
+        return list(
+            Recipe.objects.filter(author_id__in=user_ids)
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def create_ingredients(self, recipe_ids, per_recipe):
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        per_recipe = min(per_recipe, len(ingredient_ids))
+        IngredientAmount.objects.bulk_create(
+            (
+                IngredientAmount(recipe_id=recipe, ingredient_id=ingredient,
+                                 amount=self.rng.randint(1, 500))
+                for recipe in recipe_ids
+                for ingredient in self.rng.sample(ingredient_ids, per_recipe)
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def create_tags(self, recipe_ids):
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        through = Recipe.tags.through
+        through.objects.bulk_create(
+            (
+                through(recipe_id=recipe, tag_id=tag)
+                for recipe in recipe_ids
+                for tag in self.rng.sample(
+                    tag_ids, self.rng.randint(1, len(tag_ids))
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        tagstats.recount(tag_ids)
+
+    def create_links(self, user_ids, recipe_ids, options):
+        exponent = options['exponent']
+        user_weights = zipf_weights(len(user_ids), exponent, self.rng)
+        recipe_weights = zipf_weights(len(recipe_ids), exponent, self.rng)
+        follows = sample_pairs(user_ids, user_ids,
+                               options['follows_per_user'], user_weights,
+                               self.rng, allow_same=False)
+        Follow.objects.bulk_create(
+            (Follow(user_id=user, author_id=author)
+             for user, author in follows),
+            batch_size=self.batch_size,
+        )
+        for model, option in ((Favorite, 'favorites_per_user'),
+                              (ShoppingCart, 'carts_per_user')):
+            pairs = sample_pairs(user_ids, recipe_ids, options[option],
+                                 recipe_weights, self.rng)
+            model.objects.bulk_create(
+                (model(user_id=user, recipe_id=recipe)
+                 for user, recipe in pairs),
+                batch_size=self.batch_size,
+            )
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+from recipes.exchange import Importer
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Загружает рецепты из NDJSON пачками через bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', default='-',
+                            help='Файл, по умолчанию stdin.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--author',
+                            help='Email автора для рецептов, чьих авторов '
+                                 'нет в базе.')
+
+    def handle(self, *args, **options):
+        default_author = None
+        if options['author']:
+            default_author = (User.objects.filter(email=options['author'])
+                              .values_list('id', flat=True).first())
+            if default_author is None:
+                raise CommandError(f'Нет пользователя {options["author"]}.')
+        importer = Importer(options['batch_size'], default_author)
+        if options['input'] == '-':
+            stats = importer.run(sys.stdin.buffer)
+        else:
+            with open(options['input'], 'rb') as file:
+                stats = importer.run(file)
+        for error in stats.pop('errors'):
+            self.stderr.write(f'Строка {error}')
+        self.stdout.write(', '.join(
+            f'{key}: {value}' for key, value in stats.items()
+        ))
@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand
+
+from recipes.minhash import index_recipes
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает MinHash-сигнатуры и LSH-корзины рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--missing', action='store_true',
+                            help='Только рецепты без сигнатуры.')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by('id')
+        if options['missing']:
+            recipes = recipes.filter(signature__isnull=True)
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        for start in range(0, len(recipe_ids), options['batch_size']):
+            index_recipes(recipe_ids[start:start + options['batch_size']])
+        self.stdout.write(f'Проиндексировано рецептов: {len(recipe_ids)}')
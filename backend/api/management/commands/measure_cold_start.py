@@ -0,0 +1,87 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from api.management.commands.benchmark_concurrency import fetch, free_port
+
+PATHS = ('/api/recipes/', '/api/tags/', '/api/ingredients/?name=%D0%B0')
+
+
+def wait_port(server, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError('gunicorn завершился при запуске.')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise CommandError('gunicorn не открыл порт за отведённое время.')
+
+
+class Command(BaseCommand):
+    help = ('Измеряет задержку первых запросов после запуска gunicorn '
+            'без прогрева и с прогревом до fork (preload_app).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=3)
+        parser.add_argument('--steady', type=int, default=20,
+                            help='Запросов для замера прогретого воркера.')
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        results = {
+            mode: self.measure(preload, options)
+            for mode, preload in (('cold', 'False'), ('preload', 'True'))
+        }
+        output = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def measure(self, preload, options):
+        startup, first, steady = [], {path: [] for path in PATHS}, []
+        for _ in range(options['rounds']):
+            port = free_port()
+            env = os.environ.copy()
+            env.update({
+                'GUNICORN_PRELOAD': preload,
+                'GUNICORN_WORKERS': '1',
+                'GUNICORN_BIND': f'127.0.0.1:{port}',
+                'Hosts': '127.0.0.1',
+            })
+            started = time.perf_counter()
+            server = subprocess.Popen(
+                (sys.executable, '-m', 'gunicorn', '--config',
+                 'gunicorn.conf.py'),
+                cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_port(server, port)
+                startup.append(time.perf_counter() - started)
+                base = f'http://127.0.0.1:{port}'
+                for path in PATHS:
+                    first[path].append(fetch(base + path)[0])
+                steady.extend(fetch(base + PATHS[0])[0]
+                              for _ in range(options['steady']))
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        return {
+            'startup_ms': round(statistics.mean(startup) * 1000, 1),
+            'first_request_ms': {
+                path: round(statistics.mean(values) * 1000, 1)
+                for path, values in first.items()
+            },
+            'steady_p50_ms': round(statistics.median(steady) * 1000, 1),
+        }
@@ -0,0 +1,51 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users.models import User
+
+FIELDSETS = (
+    ('полный', ''),
+    ('карточка', 'fields=id,name,image,cooking_time'),
+    ('карточка с автором', 'fields=id,name,image,author&expand=author'),
+    ('id связей', 'fields=id,tags,author,ingredients'),
+    ('флаги', 'fields=id,is_favorited,is_in_shopping_cart'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Размер ответа и число запросов списка рецептов для разных '
+            '?fields=/?expand= в проекциях и DRF-сериализаторах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--user', help='email пользователя-читателя.')
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError('Пользователь не найден.')
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.stdout.write(f'{"набор полей":<20} {"режим":<12} '
+                          f'{"байт":>9} {"запросов":>9}')
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, query in FIELDSETS:
+                url = f'/api/recipes/?limit={options["limit"]}&{query}'
+                for mode, projections in (('проекции', True),
+                                          ('сериализатор', False)):
+                    with override_settings(READ_PROJECTIONS=projections):
+                        with CaptureQueriesContext(connection) as queries:
+                            response = client.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(
+                            f'{url}: ответ {response.status_code}.'
+                        )
+                    self.stdout.write(
+                        f'{name:<20} {mode:<12} '
+                        f'{len(response.content):>9} {len(queries):>9}'
+                    )
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api.sync import PRUNED_WATERMARK
+from recipes.models import RecipeChange, Watermark
+
+
+class Command(BaseCommand):
+    help = ('Удаляет старые записи журнала изменений рецептов. Клиенты '
+            'с водяным знаком до удалённых записей получат 410 и выполнят '
+            'полную синхронизацию.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.RECIPE_CHANGES_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        deadline = timezone.now() - timedelta(days=options['days'])
+        with transaction.atomic():
+            last_id = RecipeChange.objects.filter(
+                created_at__lt=deadline
+            ).aggregate(last=Max('id'))['last']
+            if last_id is None:
+                self.stdout.write('Удалять нечего.')
+                return
+            Watermark.objects.update_or_create(
+                name=PRUNED_WATERMARK, defaults={'last_id': last_id},
+            )
+            deleted, _ = RecipeChange.objects.filter(id__lte=last_id).delete()
+        self.stdout.write(f'Удалено записей журнала: {deleted}, '
+                          f'водяной знак очистки: {last_id}')
@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand
+
+from api.feed import backfill
+from recipes.models import FeedItem
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = ('Заполняет ленты подписчиков последними рецептами авторов '
+            'из подписок (для уже существующих данных).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flush', action='store_true',
+                            help='Предварительно очистить все ленты.')
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            FeedItem.objects.all().delete()
+        count = 0
+        follows = Follow.objects.select_related('user', 'author')
+        for follow in follows.iterator():
+            backfill(follow.user, follow.author)
+            count += 1
+        self.stdout.write(f'Подписок обработано: {count}, '
+                          f'записей в лентах: {FeedItem.objects.count()}')
@@ -0,0 +1,66 @@
+import signal
+import subprocess
+import sys
+import threading
+
+from django.core.management import BaseCommand
+
+from jobs.worker import requeue_stale, work
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркер фоновых задач из таблицы jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--mode', choices=('threads', 'processes'),
+                            default='threads')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда очередь опустеет.')
+        parser.add_argument('--poll-interval', type=float)
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'processes' and options['concurrency'] > 1:
+            self.run_processes(options)
+            return
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших: {requeued}')
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    work(stop, options['burst'], options['poll_interval'])
+                ),
+                name=f'worker-{number}',
+            )
+            for number in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(f'Выполнено задач: {sum(results)}')
+
+    @staticmethod
+    def run_processes(options):
+        """Каждый процесс — отдельный однопоточный run_worker."""
+        command = [sys.executable, sys.argv[0], 'run_worker']
+        if options['burst']:
+            command.append('--burst')
+        if options['poll_interval']:
+            command += ['--poll-interval', str(options['poll_interval'])]
+        processes = [subprocess.Popen(command)
+                     for _ in range(options['concurrency'])]
+
+        def terminate(*args):
+            for process in processes:
+                process.terminate()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, terminate)
+        for process in processes:
+            process.wait()
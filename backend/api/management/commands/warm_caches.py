@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from recipes.models import Tag
+
+
+class Command(BaseCommand):
+    help = ('Заполняет общий кеш первыми страницами популярных запросов '
+            'списка рецептов (для анонимных пользователей).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=settings.ALLOWED_HOSTS[0]
+                            or 'localhost')
+        parser.add_argument('--scheme', choices=('http', 'https'),
+                            default='http')
+        parser.add_argument('--pages', type=int,
+                            default=settings.WARM_CACHE_PAGES)
+        parser.add_argument('--tags', type=int, default=5,
+                            help='Сколько популярных тегов прогреть.')
+
+    def handle(self, *args, **options):
+        if 'LocMemCache' in settings.CACHES['default']['BACKEND']:
+            self.stderr.write('LocMemCache живёт внутри процесса: прогрев '
+                              'не будет виден воркерам gunicorn.')
+        slugs = list(
+            Tag.objects.annotate(total=Count('tags'))
+            .order_by('-total').values_list('slug', flat=True)
+            [:options['tags']]
+        )
+        queries = [{}] + [{'tags': slug} for slug in slugs]
+        client = APIClient()
+        started = time.perf_counter()
+        count = 0
+        for query in queries:
+            for page in range(1, options['pages'] + 1):
+                response = client.get(
+                    '/api/recipes/', {**query, 'page': page},
+                    HTTP_HOST=options['host'],
+                    secure=options['scheme'] == 'https',
+                )
+                if response.status_code != 200:
+                    break
+                count += 1
+                if not response.json().get('next'):
+                    break
+        self.stdout.write(f'Прогрето страниц: {count} за '
+                          f'{time.perf_counter() - started:.2f} с')
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.compression import compress_cached, negotiate
+from api.instrumentation import RequestStats, registry, request_stats
+from api.profiling import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+
+def view_name(request, view_func):
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+class RequestStatsMiddleware(MiddlewareMixin):
+    """Время, SQL-запросы и размер ответа по каждому представлению."""
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_STATS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats = RequestStats()
+        with request_stats(stats):
+            request.stats = stats
+            response = self.get_response(request)
+        return self.finish(stats, response)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        # В async-режиме SQL учитывается в потоках представлений.
+        with request_stats(stats, queries=False):
+            request.stats = stats
+            response = await self.get_response(request)
+        return self.finish(stats, response)
+
+    def finish(self, stats, response):
+        if stats.view is None:
+            return response
+        wall = stats.elapsed
+        size = 0 if response.streaming else len(response.content)
+        registry.add(stats.view, wall, stats.queries, stats.db_time,
+                     stats.serializer_time, size)
+        self.log(stats, wall)
+        if settings.REQUEST_STATS_SERVER_TIMING:
+            response['Server-Timing'] = self.server_timing(stats, wall)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.stats.view = view_name(request, view_func)
+
+    @staticmethod
+    def server_timing(stats, wall):
+        return (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} SQL", '
+            f'ser;dur={stats.serializer_time * 1000:.1f}, '
+            f'total;dur={wall * 1000:.1f}'
+        )
+
+    @staticmethod
+    def log(stats, wall):
+        if wall * 1000 >= settings.REQUEST_STATS_SLOW_MS:
+            logger.warning('Медленный запрос %s: %.0f мс, %d SQL (%.0f мс)',
+                           stats.view, wall * 1000, stats.queries,
+                           stats.db_time * 1000)
+        duplicates = stats.duplicates(settings.REQUEST_STATS_DUPLICATE_QUERIES)
+        for sql, count, origin in duplicates:
+            logger.warning('N+1 в %s: запрос выполнен %d раз, поле %s: %s',
+                           stats.view, count, origin or '-', sql)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """gzip/brotli по Accept-Encoding, в том числе для потоковых ответов.
+
+    Ответы с ETag (кешируемые страницы рецептов) берут сжатые байты
+    из кеша, остальные сжимаются на каждый запрос.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @staticmethod
+    def is_compressible(response):
+        content_type = response.get('Content-Type', '').split(';')[0]
+        return (
+            not response.has_header('Content-Encoding')
+            and content_type.startswith(settings.COMPRESSION_CONTENT_TYPES)
+            and (response.streaming
+                 or len(response.content) >= settings.COMPRESSION_MIN_SIZE)
+        )
+
+    def process_response(self, request, response):
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codec is None:
+            return response
+        if response.streaming:
+            response.streaming_content = codec.stream(
+                response.streaming_content
+            )
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            if response.has_header('ETag'):
+                compressed = compress_cached(codec, response.content)
+            else:
+                compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and not etag.startswith('W/'):
+            # Сжатое представление побайтно отличается от исходного.
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = codec.name
+        return response
+
+
+class ProfilerMiddleware(MiddlewareMixin):
+    """Профиль запроса вместо ответа по ?_profile=1 или ?_profile=collapsed.
+
+    Доступно только активным сотрудникам, чей email указан
+    в PROFILER_ALLOWED_USERS; для остальных параметр игнорируется.
+    """
+
+    async_capable = False
+    param = '_profile'
+
+    def __init__(self, get_response):
+        if (not settings.PROFILER_ENABLED
+                or not settings.PROFILER_ALLOWED_USERS):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @staticmethod
+    def is_allowed(request):
+        user = request.user
+        if not user.is_authenticated:
+            # Токен API проверяется DRF уже в представлении.
+            try:
+                authenticated = TokenAuthentication().authenticate(request)
+            except AuthenticationFailed:
+                return False
+            if authenticated is None:
+                return False
+            user = authenticated[0]
+        return (user.is_active and user.is_staff
+                and user.get_username() in settings.PROFILER_ALLOWED_USERS)
+
+    def __call__(self, request):
+        mode = request.GET.get(self.param)
+        if mode is None or not self.is_allowed(request):
+            return self.get_response(request)
+        request.GET = request.GET.copy()
+        del request.GET[self.param]
+        request.META['QUERY_STRING'] = request.GET.urlencode()
+        with RequestProfile(request) as profile:
+            response = self.get_response(request)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+        path = profile.store()
+        logger.info('Профиль %s: %d мс, файл %s', request.get_full_path(),
+                    profile.wall * 1000, path or '-')
+        if mode == 'collapsed':
+            return HttpResponse(profile.sampler.collapsed(),
+                                content_type='text/plain; charset=utf-8')
+        return JsonResponse(profile.report(response, size, path),
+                            json_dumps_params={'ensure_ascii': False})
@@ -4,6 +4,7 @@ from django.shortcuts import get_object_or_404
 
 from recipes.models import Recipe
 
+from api.cache import bump_version, viewer_version_key
 from api.serializers import RecipeShortSerializer
 
 
@@ -14,6 +15,7 @@ class AddDeleteMixin:
                             status=status.HTTP_400_BAD_REQUEST)
         recipe = get_object_or_404(Recipe, id=pk)
         model.objects.create(user=user, recipe=recipe)
+        bump_version(viewer_version_key(user.pk))
         serializer = RecipeShortSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -21,6 +23,7 @@ class AddDeleteMixin:
         obj = model.objects.filter(user=user, recipe__id=pk)
         if obj.exists():
             obj.delete()
+            bump_version(viewer_version_key(user.pk))
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({'errors': 'Рецепт уже удален!'},
                         status=status.HTTP_400_BAD_REQUEST)
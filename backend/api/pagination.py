@@ -1,6 +1,97 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from datetime import datetime
+
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class Pagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_query_param = 'page'
+
+
+class KeysetPagination(BasePagination):
+    """Курсор — позиция (pub_date, id) последней записи страницы.
+
+    В отличие от номеров страниц, стоимость не растёт с глубиной
+    пролистывания, а новые записи не сдвигают уже просмотренные.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_positions(self, fetch, request):
+        """fetch(position, limit) возвращает позиции по убыванию."""
+        self.request = request
+        size = self.get_page_size(request)
+        positions = fetch(self.decode_cursor(request), size + 1)
+        self.next_position = (positions[size - 1]
+                              if len(positions) > size else None)
+        return positions[:size]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                cursor.encode('ascii')
+            ).decode('ascii').split('|')
+            return datetime.fromisoformat(pub_date), int(pk)
+        except (DecodeError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def encode_cursor(position):
+        pub_date, pk = position
+        return urlsafe_b64encode(
+            f'{pub_date.isoformat()}|{pk}'.encode('ascii')
+        ).decode('ascii')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class FollowerPagination(KeysetPagination):
+    """Курсор — id подписки (Follow) последней записи страницы.
+
+    Позиции — пары (id подписки, id подписчика) по убыванию.
+    """
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            return int(urlsafe_b64decode(cursor.encode('ascii')))
+        except (DecodeError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def encode_cursor(position):
+        follow_id, _ = position
+        return urlsafe_b64encode(str(follow_id).encode('ascii')).decode(
+            'ascii'
+        )
@@ -0,0 +1,26 @@
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson; при любой ошибке разбора — стандартный путь."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Повторный разбор даёт привычные сообщения об ошибках
+            # и поддержку не-UTF-8 кодировок из parser_context.
+            return super().parse(BytesIO(body), media_type, parser_context)
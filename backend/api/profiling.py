@@ -0,0 +1,183 @@
+"""Профилирование отдельного запроса по ?_profile.
+
+Стек потока запроса снимается из отдельного потока каждые
+PROFILER_INTERVAL секунд и сворачивается в формат collapsed stacks
+(строка «кадр;кадр;кадр число»), который понимают flamegraph.pl,
+speedscope и inferno. Каждый SQL-запрос учитывается вместе с полем
+сериализатора, внутри которого он выполнен.
+
+Профиль доступен через contextvar: асинхронные представления на чтение
+(ASYNC_READ_VIEWS) выполняются в потоках пула api-read, и run_view
+переносит на такой поток и сэмплер, и учёт запросов.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.text import slugify
+
+from api.instrumentation import (collect_queries, query_fingerprint,
+                                 serializer_field_origin)
+
+MAX_STACK_DEPTH = 200
+
+_current_profile = ContextVar('request_profile', default=None)
+
+
+def get_current_profile():
+    return _current_profile.get()
+
+
+def frame_label(code):
+    path = code.co_filename
+    if path.startswith(str(settings.BASE_DIR)):
+        path = os.path.relpath(path, settings.BASE_DIR)
+    else:
+        path = '/'.join(path.split(os.sep)[-2:])
+    return f'{path}:{code.co_name}'
+
+
+def collapse(frame):
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """Снимает стек потока thread_id каждые interval секунд."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True,
+                                        name='request-profiler')
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    @contextmanager
+    def watch(self, thread_id):
+        """Временно снимает стек потока thread_id вместо исходного."""
+        previous, self.thread_id = self.thread_id, thread_id
+        try:
+            yield
+        finally:
+            self.thread_id = previous
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n'
+                       for stack, count in self.stacks.most_common())
+
+
+class QueryProfile:
+    """Число и время SQL-запросов по (запрос, поле сериализатора)."""
+
+    def __init__(self):
+        self.rows = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            row = self.rows[
+                (query_fingerprint(sql), serializer_field_origin())
+            ]
+            row[0] += 1
+            row[1] += time.perf_counter() - start
+
+    def report(self):
+        return sorted(
+            ({'sql': sql, 'origin': origin, 'count': count,
+              'ms': round(seconds * 1000, 2)}
+             for (sql, origin), (count, seconds) in self.rows.items()),
+            key=lambda row: row['ms'], reverse=True,
+        )
+
+
+class RequestProfile:
+
+    def __init__(self, request):
+        self.request = request
+        self.thread_id = threading.get_ident()
+        self.sampler = StackSampler(self.thread_id,
+                                    settings.PROFILER_INTERVAL)
+        self.queries = QueryProfile()
+        self._stack = ExitStack()
+        self.wall = None
+
+    def __enter__(self):
+        self._stack.enter_context(collect_queries(self.queries))
+        self._stack.enter_context(self.sampler)
+        token = _current_profile.set(self)
+        self._stack.callback(_current_profile.reset, token)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall = time.perf_counter() - self.started
+        self._stack.close()
+
+    @contextmanager
+    def follow(self):
+        """Профилирует текущий поток, если он не поток запроса."""
+        thread_id = threading.get_ident()
+        if thread_id == self.thread_id:
+            yield
+            return
+        with collect_queries(self.queries), self.sampler.watch(thread_id):
+            yield
+
+    def store(self):
+        """Сохраняет collapsed stacks в PROFILER_DIR, возвращает путь."""
+        if not settings.PROFILER_DIR:
+            return None
+        os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+        name = (f'{timezone.now():%Y%m%d-%H%M%S-%f}-'
+                f'{slugify(self.request.path) or "root"}')
+        path = os.path.join(settings.PROFILER_DIR, f'{name}.folded')
+        with open(path, 'w', encoding='utf-8') as folded:
+            folded.write(self.sampler.collapsed())
+        with open(os.path.join(settings.PROFILER_DIR, f'{name}.sql.json'),
+                  'w', encoding='utf-8') as breakdown:
+            json.dump(self.queries.report(), breakdown, ensure_ascii=False,
+                      indent=2)
+        return path
+
+    def report(self, response, size, path=None):
+        sql = self.queries.report()
+        return {
+            'path': self.request.get_full_path(),
+            'status': response.status_code,
+            'bytes': size,
+            'wall_ms': round(self.wall * 1000, 2),
+            'interval_ms': settings.PROFILER_INTERVAL * 1000,
+            'samples': sum(self.sampler.stacks.values()),
+            'queries': sum(row['count'] for row in sql),
+            'db_ms': round(sum(row['ms'] for row in sql), 2),
+            'sql': sql,
+            'file': path,
+            'collapsed': self.sampler.collapsed(),
+        }
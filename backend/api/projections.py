@@ -0,0 +1,341 @@
+"""Быстрые read-проекции для списков без DRF-сериализаторов.
+
+Каждая функция строит словари той же формы, что и соответствующий
+сериализатор (RecipeReadSerializer, FollowSerializer, IngredientSerializer),
+за фиксированное число запросов через values() и аннотации.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, Exists, F, OuterRef, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from api.fieldsets import (RECIPE_FIELDS, RECIPE_RELATIONS,
+                           SUBSCRIPTION_FIELDS, SUBSCRIPTION_RELATIONS,
+                           FieldSet)
+from api.instrumentation import track_serialization
+from recipes.models import (Favorite, IngredientAmount, Recipe, ShoppingCart,
+                            Tag)
+from users.models import Follow, User
+
+USER_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+RECIPE_SHORT_FIELDS = ('id', 'name', 'image', 'cooking_time')
+RECIPE_COLUMNS = ('name', 'image', 'text', 'cooking_time')
+
+image_storage = Recipe._meta.get_field('image').storage
+
+
+def image_url(name, request):
+    if not name:
+        return None
+    url = image_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def get_viewer(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    return user
+
+
+def subscribed_author_ids(viewer, author_ids):
+    if viewer is None:
+        return set()
+    return set(
+        Follow.objects.filter(user=viewer, author_id__in=author_ids)
+        .values_list('author_id', flat=True)
+    )
+
+
+def project_users(user_ids, request):
+    viewer = get_viewer(request)
+    users = User.objects.filter(id__in=user_ids).values(*USER_FIELDS)
+    subscribed = subscribed_author_ids(viewer, user_ids)
+    return {
+        user['id']: {**user, 'is_subscribed': user['id'] in subscribed}
+        for user in users
+    }
+
+
+def project_tags(recipe_ids, expand=True):
+    through = Recipe.tags.through
+    result = defaultdict(list)
+    links = (through.objects.filter(recipe_id__in=recipe_ids)
+             .order_by('-tag_id').values_list('recipe_id', 'tag_id'))
+    if not expand:
+        for recipe_id, tag_id in links:
+            result[recipe_id].append(tag_id)
+        return result
+    tags = {tag['id']: tag for tag in Tag.objects.values(*TAG_FIELDS)}
+    for recipe_id, tag_id in links:
+        result[recipe_id].append(dict(tags[tag_id]))
+    return result
+
+
+def project_ingredients(recipe_ids, expand=True):
+    result = defaultdict(list)
+    if not expand:
+        rows = (IngredientAmount.objects.filter(recipe_id__in=recipe_ids)
+                .order_by('id').values_list('recipe_id', 'ingredient_id'))
+        for recipe_id, ingredient_id in rows:
+            result[recipe_id].append(ingredient_id)
+        return result
+    rows = (
+        IngredientAmount.objects.filter(recipe_id__in=recipe_ids)
+        .order_by('id')
+        .values_list('recipe_id', 'ingredient_id', 'ingredient__name',
+                     'ingredient__measurement_unit', 'amount')
+    )
+    for recipe_id, ingredient_id, name, unit, amount in rows:
+        result[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount,
+        })
+    return result
+
+
+def annotate_flags(queryset, viewer):
+    if viewer is None:
+        return queryset
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(recipe=OuterRef('pk'), user=viewer)
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(recipe=OuterRef('pk'), user=viewer)
+        ),
+    )
+
+
+def viewer_flags(viewer, recipe_ids, fieldset=None):
+    """Контекст сериализатора рецептов с флагами viewer.
+
+    Флаги считаются запросом на все рецепты вместо запроса на каждый,
+    флаги вне fieldset не запрашиваются. Для анонима множества пустые.
+    """
+    fieldset = fieldset or FieldSet(RECIPE_FIELDS, RECIPE_RELATIONS)
+    flags = {'favorited': set(), 'in_shopping_cart': set(),
+             'subscribed': set()}
+    if viewer is None:
+        return flags
+    if 'is_favorited' in fieldset:
+        flags['favorited'] = set(
+            Favorite.objects.filter(user=viewer, recipe_id__in=recipe_ids)
+            .values_list('recipe_id', flat=True)
+        )
+    if 'is_in_shopping_cart' in fieldset:
+        flags['in_shopping_cart'] = set(
+            ShoppingCart.objects.filter(user=viewer,
+                                        recipe_id__in=recipe_ids)
+            .values_list('recipe_id', flat=True)
+        )
+    if fieldset.expanded('author'):
+        flags['subscribed'] = subscribed_author_ids(
+            viewer,
+            Recipe.objects.filter(id__in=recipe_ids).values('author_id'),
+        )
+    return flags
+
+
+def apply_flags(recipe, flags):
+    """Копия рецепта без персональных флагов с флагами из viewer_flags."""
+    recipe = dict(recipe)
+    if 'is_favorited' in recipe:
+        recipe['is_favorited'] = recipe['id'] in flags['favorited']
+    if 'is_in_shopping_cart' in recipe:
+        recipe['is_in_shopping_cart'] = (recipe['id']
+                                         in flags['in_shopping_cart'])
+    if isinstance(recipe.get('author'), dict):
+        recipe['author'] = dict(
+            recipe['author'],
+            is_subscribed=recipe['author']['id'] in flags['subscribed'],
+        )
+    return recipe
+
+
+def project_recipes(recipe_ids, request, fieldset=None):
+    """Рецепты в порядке recipe_ids в форме RecipeReadSerializer.
+
+    Поля и связи вне fieldset не запрашиваются из базы.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return []
+    fieldset = fieldset or FieldSet(RECIPE_FIELDS, RECIPE_RELATIONS)
+    with track_serialization():
+        viewer = get_viewer(request)
+        flags = [flag for flag in ('is_favorited', 'is_in_shopping_cart')
+                 if flag in fieldset]
+        fields = ['id'] + [field for field in RECIPE_COLUMNS
+                           if field in fieldset]
+        if 'author' in fieldset:
+            fields.append('author_id')
+        queryset = Recipe.objects.filter(id__in=recipe_ids).order_by()
+        if viewer is not None and flags:
+            queryset = annotate_flags(queryset, viewer)
+            fields += flags
+        rows = {row['id']: row for row in queryset.values(*fields)}
+        related = {}
+        if fieldset.expanded('author'):
+            related['author'] = project_users(
+                {row['author_id'] for row in rows.values()}, request
+            )
+        if 'tags' in fieldset:
+            related['tags'] = project_tags(recipe_ids,
+                                           fieldset.expanded('tags'))
+        if 'ingredients' in fieldset:
+            related['ingredients'] = project_ingredients(
+                recipe_ids, fieldset.expanded('ingredients')
+            )
+        return [
+            project_recipe(row, related, request, fieldset)
+            for row in map(rows.get, recipe_ids) if row is not None
+        ]
+
+
+def project_recipe(row, related, request, fieldset):
+    result = {}
+    for field in fieldset.fields:
+        if field == 'author':
+            value = row['author_id']
+            if fieldset.expanded('author'):
+                value = dict(related['author'][value])
+        elif field in ('tags', 'ingredients'):
+            value = related[field][row['id']]
+        elif field == 'image':
+            value = image_url(row['image'], request)
+        else:
+            value = row.get(field, False)
+        result[field] = value
+    return result
+
+
+def latest_recipes(author_ids, limit, fields):
+    """Первые limit рецептов каждого автора одним запросом.
+
+    Порядок — как у Recipe.Meta.ordering. Django 3.2 не фильтрует по
+    оконным функциям, поэтому row_number() считается в подзапросе.
+    """
+    ranked = (
+        Recipe.objects.filter(author_id__in=author_ids).order_by()
+        .annotate(position=Window(
+            RowNumber(), partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        ))
+        .values('id', 'position')
+    )
+    sql, params = ranked.query.sql_with_params()
+    return Recipe.objects.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) ranked WHERE ranked.position <= %s',
+        (*params, limit),
+    )).values('author_id', *fields)
+
+
+def project_subscriptions(authors, request, recipes_limit=None,
+                          fieldset=None):
+    """Авторы (словари с USER_FIELDS) в форме FollowSerializer."""
+    authors = list(authors)
+    fieldset = fieldset or FieldSet(SUBSCRIPTION_FIELDS,
+                                    SUBSCRIPTION_RELATIONS)
+    with track_serialization():
+        author_ids = [author['id'] for author in authors]
+        recipes, counts = defaultdict(list), {}
+        if 'recipes' in fieldset:
+            fields = (RECIPE_SHORT_FIELDS if fieldset.expanded('recipes')
+                      else ('id',))
+            if recipes_limit is None:
+                rows = (Recipe.objects.filter(author_id__in=author_ids)
+                        .values('author_id', *fields))
+            else:
+                rows = latest_recipes(author_ids, recipes_limit, fields)
+            for row in rows:
+                recipes[row.pop('author_id')].append(row)
+        if 'recipes_count' in fieldset:
+            counts = dict(
+                Recipe.objects.filter(author_id__in=author_ids)
+                .order_by().values('author_id')
+                .annotate(total=Count('id')).values_list('author_id', 'total')
+            )
+        result = []
+        for author in authors:
+            shown = recipes[author['id']]
+            item = {}
+            for field in fieldset.fields:
+                if field == 'recipes_count':
+                    item[field] = counts.get(author['id'], 0)
+                elif field == 'recipes' and fieldset.expanded('recipes'):
+                    # FollowSerializer отдаёт вложенные рецепты без
+                    # request, поэтому ссылки на картинки относительные.
+                    item[field] = [
+                        {**recipe, 'image': image_url(recipe['image'], None)}
+                        for recipe in shown
+                    ]
+                elif field == 'recipes':
+                    item[field] = [recipe['id'] for recipe in shown]
+                elif field == 'is_subscribed':
+                    item[field] = True
+                else:
+                    item[field] = author[field]
+            result.append(item)
+        return result
+
+
+def follower_positions(author_id, position, limit):
+    """(id подписки, id подписчика) по убыванию id подписки."""
+    follows = Follow.objects.filter(author_id=author_id)
+    if position is not None:
+        follows = follows.filter(id__lt=position)
+    return list(follows.order_by('-id').values_list('id', 'user_id')[:limit])
+
+
+def project_followers(follower_ids, author_id, request):
+    """Подписчики автора в форме UserSerializer с флагом is_mutual.
+
+    is_mutual — автор подписан на подписчика в ответ; считается одним
+    запросом на страницу.
+    """
+    follower_ids = list(follower_ids)
+    with track_serialization():
+        viewer = get_viewer(request)
+        users = {
+            user['id']: user for user in
+            User.objects.filter(id__in=follower_ids).values(*USER_FIELDS)
+        }
+        mutual = set(
+            Follow.objects.filter(user_id=author_id,
+                                  author_id__in=follower_ids)
+            .values_list('author_id', flat=True)
+        )
+        if viewer is not None and viewer.pk == author_id:
+            subscribed = mutual
+        else:
+            subscribed = subscribed_author_ids(viewer, follower_ids)
+        return [
+            {
+                **users[user_id],
+                'is_subscribed': user_id in subscribed,
+                'is_mutual': user_id in mutual,
+            }
+            for user_id in follower_ids if user_id in users
+        ]
+
+
+def project_ingredient_list(queryset):
+    with track_serialization():
+        return list(queryset.values('id', 'name', 'measurement_unit'))
+
+
+def subscribed_authors(user):
+    """Авторы из подписок user в порядке подписки."""
+    return (User.objects.filter(following__user=user)
+            .order_by('following__id'))
+
+
+def subscription_authors(user):
+    return subscribed_authors(user).values(*USER_FIELDS)
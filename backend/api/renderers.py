@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+def has_floats(data):
+    """Есть ли в данных числа с плавающей точкой или Decimal."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, (float, Decimal)):
+            return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с тем же байтовым результатом.
+
+    Без orjson, а также для отступов, ASCII-режима и данных, которые orjson
+    не кодирует (большие целые, нестроковые ключи), работает стандартный
+    JSONRenderer. Данные с дробными числами тоже уходят в стандартный
+    JSONRenderer: orjson пишет 1e-05 как 0.00001, а NaN как null вместо
+    ошибки при STRICT_JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            or has_floats(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
@@ -6,11 +6,33 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField
 
+from api.feed import publish
+from api.instrumentation import TimedSerializerMixin
+from recipes.minhash import index_recipe
 from recipes.models import Ingredient, Recipe, IngredientAmount, Tag
 from users.models import User
 
 
-class UserSerializer(ModelSerializer):
+class SparseFieldsMixin:
+    """Оставляет поля из context['fieldset'], нераскрытые связи — id."""
+
+    collapsed_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            return fields
+        for name in list(fields):
+            if name not in fieldset:
+                del fields[name]
+            elif (name in self.collapsed_fields
+                  and not fieldset.expanded(name)):
+                fields[name] = self.collapsed_fields[name]()
+        return fields
+
+
+class UserSerializer(TimedSerializerMixin, ModelSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
 
     class Meta:
@@ -19,18 +41,26 @@ class UserSerializer(ModelSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
+        subscribed = self.context.get('subscribed')
+        if subscribed is not None:
+            return obj.id in subscribed
         user = self.context.get('request').user
         if self.context.get('request').user.is_anonymous:
             return False
         return user.follower.filter(author=obj).exists()
 
 
-class FollowSerializer(UserSerializer):
+class FollowSerializer(SparseFieldsMixin, UserSerializer):
     recipes_count = serializers.IntegerField(
         source='recipes.count', read_only=True
     )
     is_subscribed = serializers.BooleanField(default=True)
     recipes = serializers.SerializerMethodField(method_name='get_recipes')
+    collapsed_fields = {
+        'recipes': lambda: serializers.SerializerMethodField(
+            method_name='get_recipe_ids'
+        ),
+    }
 
     class Meta:
         model = User
@@ -38,15 +68,22 @@ class FollowSerializer(UserSerializer):
                   'recipes_count', 'recipes', 'is_subscribed')
         read_only_fields = ('email', 'username', 'first_name', 'last_name')
 
-    def get_recipes(self, obj):
+    def limited_recipes(self, obj):
         request = self.context.get('request')
         recipes_limit = request.GET.get('recipes_limit')
         recipes = obj.recipes.all()
         if recipes_limit:
             recipes = recipes[:int(recipes_limit)]
-        serializer = RecipeShortSerializer(recipes, many=True)
+        return recipes
+
+    def get_recipes(self, obj):
+        serializer = RecipeShortSerializer(self.limited_recipes(obj),
+                                           many=True)
         return serializer.data
 
+    def get_recipe_ids(self, obj):
+        return [recipe.id for recipe in self.limited_recipes(obj)]
+
     def validate(self, data):
         author_id = (
             self.context.get('request').parser_context.get('kwargs').get('pk')
@@ -66,21 +103,21 @@ class FollowSerializer(UserSerializer):
         return data
 
 
-class IngredientSerializer(ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, ModelSerializer):
 
     class Meta:
         model = Ingredient
         fields = '__all__'
 
 
-class TagSerializer(ModelSerializer):
+class TagSerializer(TimedSerializerMixin, ModelSerializer):
 
     class Meta:
         model = Tag
         fields = '__all__'
 
 
-class RecipeShortSerializer(ModelSerializer):
+class RecipeShortSerializer(TimedSerializerMixin, ModelSerializer):
     image = Base64ImageField()
 
     class Meta:
@@ -102,7 +139,8 @@ class IngredientAmountSerializer(ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeReadSerializer(ModelSerializer):
+class RecipeReadSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                           ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     ingredients = IngredientAmountSerializer(
         many=True,
@@ -112,6 +150,14 @@ class RecipeReadSerializer(ModelSerializer):
     author = UserSerializer(read_only=True)
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
+    collapsed_fields = {
+        'tags': lambda: PrimaryKeyRelatedField(many=True, read_only=True),
+        'author': lambda: PrimaryKeyRelatedField(read_only=True),
+        'ingredients': lambda: serializers.SlugRelatedField(
+            source='recipe_ingredients', slug_field='ingredient_id',
+            many=True, read_only=True,
+        ),
+    }
 
     class Meta:
         model = Recipe
@@ -120,6 +166,9 @@ class RecipeReadSerializer(ModelSerializer):
                   'cooking_time',)
 
     def get_is_favorited(self, obj):
+        favorited = self.context.get('favorited')
+        if favorited is not None:
+            return obj.id in favorited
         user = self.context.get('request').user
         return (
             user
@@ -128,6 +177,9 @@ class RecipeReadSerializer(ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        in_shopping_cart = self.context.get('in_shopping_cart')
+        if in_shopping_cart is not None:
+            return obj.id in in_shopping_cart
         user = self.context.get('request').user
         return (
             user
@@ -159,6 +211,7 @@ class RecipeCreateSerializer(ModelSerializer):
 
     @staticmethod
     def create_ingredients(recipe, ingredients):
+        index_recipe(recipe, [item['id'].id for item in ingredients])
         recipe_ingredients = []
         for ingredient in ingredients:
             recipe_ingredients.append(
@@ -178,6 +231,7 @@ class RecipeCreateSerializer(ModelSerializer):
         recipe = Recipe.objects.create(author=request.user, **validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(recipe, ingredients)
+        publish(recipe)
         return recipe
 
     @transaction.atomic()
@@ -0,0 +1,49 @@
+"""Инкрементальная синхронизация рецептов по журналу RecipeChange.
+
+Клиент хранит водяной знак (id последней полученной записи журнала)
+и запрашивает изменения после него. Автоинкремент выдаёт id до фиксации
+транзакции, поэтому запись с меньшим id может стать видимой позже
+записи с большим. Свежие записи моложе RECIPE_CHANGES_SETTLE секунд
+не отдаются, чтобы водяной знак не перескочил через них.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from recipes.models import RecipeChange, Watermark
+
+PRUNED_WATERMARK = 'recipe_changes'
+
+
+def pruned_until():
+    watermark = Watermark.objects.filter(name=PRUNED_WATERMARK).first()
+    return watermark.last_id if watermark is not None else 0
+
+
+def changes_after(since, limit):
+    """Последнее действие по каждому рецепту в пачке журнала после since.
+
+    Возвращает список (recipe_id, action) в порядке последних изменений,
+    id последней прочитанной записи журнала и признак того, что пачка
+    заполнена целиком и за ней могут быть ещё записи.
+    """
+    settled = timezone.now() - timedelta(
+        seconds=settings.RECIPE_CHANGES_SETTLE
+    )
+    rows = list(
+        RecipeChange.objects.filter(id__gt=since, created_at__lte=settled)
+        .order_by('id').values_list('id', 'recipe_id', 'action')[:limit]
+    )
+    first, last = {}, {}
+    for _, recipe_id, action in rows:
+        first.setdefault(recipe_id, action)
+        last.pop(recipe_id, None)
+        last[recipe_id] = action
+    changes = []
+    for recipe_id, action in last.items():
+        # Созданный и изменённый в пределах пачки рецепт для клиента новый.
+        if action == RecipeChange.UPDATED:
+            action = first[recipe_id]
+        changes.append((recipe_id, action))
+    return changes, rows[-1][0] if rows else since, len(rows) == limit
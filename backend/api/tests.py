@@ -0,0 +1,293 @@
+import datetime
+import json
+import math
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+RECIPES = 10
+CARD = 'fields=id,name,image,cooking_time'
+IDS_ONLY = 'fields=id,tags,author,ingredients'
+FULL = ''
+MODES = {'проекции': True, 'сериализатор': False}
+# Запросы страницы: токен, COUNT, id страницы, валидаторы, рецепты и
+# по запросу на каждую подгружаемую связь или флаги читателя.
+QUERIES = {
+    (CARD, True): 5, (CARD, False): 5,
+    (IDS_ONLY, True): 7, (IDS_ONLY, False): 7,
+    (FULL, True): 10, (FULL, False): 11,
+}
+# Бюджет байт ответа на один рецепт.
+PAYLOAD_BUDGET = {CARD: 150, IDS_ONLY: 100, FULL: 1500}
+CONTRACT_URLS = (
+    '/api/recipes/',
+    '/api/recipes/?limit=3',
+    '/api/recipes/?limit=3&page=2',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    f'/api/recipes/?{CARD}',
+    f'/api/recipes/?{IDS_ONLY},is_favorited',
+    '/api/recipes/?fields=id,author,tags&expand=author',
+    '/api/users/subscriptions/',
+    '/api/users/subscriptions/?recipes_limit=2',
+    '/api/users/subscriptions/?fields=id,username,recipes_count',
+    '/api/users/subscriptions/?fields=id,recipes&recipes_limit=1',
+    '/api/ingredients/',
+    '/api/ingredients/?name=Ин',
+)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class RecipeFieldsetTests(TestCase):
+    """Число запросов и размер списка рецептов для наборов ?fields=."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create(
+            username='viewer', email='viewer@example.com',
+            first_name='Читатель', last_name='Рецептов',
+        )
+        author = User.objects.create(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов',
+        )
+        Follow.objects.create(user=cls.viewer, author=author)
+        tags = [Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}',
+                                   color=f'#00000{number}')
+                for number in range(3)]
+        ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(5)
+        ]
+        for number in range(RECIPES):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}',
+                text='Описание рецепта. ' * 10, cooking_time=10,
+                image='recipes/images/test.gif',
+            )
+            recipe.tags.set(tags)
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(recipe=recipe, ingredient=ingredient,
+                                 amount=number + 1)
+                for ingredient in ingredients
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        token, _ = Token.objects.get_or_create(user=self.viewer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def fetch(self, query, projections, limit=RECIPES):
+        url = f'/api/recipes/?limit={limit}&{query}'
+        with override_settings(READ_PROJECTIONS=projections):
+            # Первый запрос прогревает каталог тегов и ингредиентов.
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_counts(self):
+        for (query, projections), count in QUERIES.items():
+            with self.subTest(query=query, projections=projections):
+                url = f'/api/recipes/?limit={RECIPES}&{query}'
+                with override_settings(READ_PROJECTIONS=projections):
+                    self.client.get(url)
+                    with self.assertNumQueries(count):
+                        self.client.get(url)
+
+    def test_query_counts_do_not_grow_with_page(self):
+        for query in (CARD, IDS_ONLY, FULL):
+            for mode, projections in MODES.items():
+                with self.subTest(query=query, mode=mode):
+                    _, one = self.fetch(query, projections, limit=1)
+                    _, page = self.fetch(query, projections)
+                    self.assertEqual(one, page)
+
+    def test_payload_sizes(self):
+        for mode, projections in MODES.items():
+            sizes = {}
+            for query, budget in PAYLOAD_BUDGET.items():
+                with self.subTest(query=query, mode=mode):
+                    response, _ = self.fetch(query, projections)
+                    sizes[query] = len(response.content)
+                    self.assertLessEqual(sizes[query], budget * RECIPES)
+            with self.subTest(mode=mode):
+                self.assertLess(sizes[IDS_ONLY], sizes[CARD])
+                self.assertLess(sizes[CARD] * 5, sizes[FULL])
+
+    def test_card_fields(self):
+        for mode, projections in MODES.items():
+            with self.subTest(mode=mode):
+                response, _ = self.fetch(CARD, projections)
+                for recipe in response.json()['results']:
+                    self.assertEqual(
+                        set(recipe), {'id', 'name', 'image', 'cooking_time'}
+                    )
+
+    def test_modes_return_same_payload(self):
+        for query in (CARD, IDS_ONLY, FULL):
+            with self.subTest(query=query):
+                projected, _ = self.fetch(query, True)
+                serialized, _ = self.fetch(query, False)
+                self.assertEqual(json.loads(projected.content),
+                                 json.loads(serialized.content))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ProjectionContractTests(TestCase):
+    """Read-проекции отдают тот же JSON, что и DRF-сериализаторы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create(username='viewer',
+                                         email='viewer@example.com')
+        authors = [
+            User.objects.create(username=f'author{number}',
+                                email=f'author{number}@example.com',
+                                first_name='Автор', last_name=str(number))
+            for number in range(3)
+        ]
+        for author in reversed(authors):
+            Follow.objects.create(user=cls.viewer, author=author)
+        tags = [Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}',
+                                   color=f'#00000{number}')
+                for number in range(2)]
+        ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Ингредиент', 'Мука', 'Инжир', 'Соль')
+        ]
+        for number in range(8):
+            recipe = Recipe.objects.create(
+                author=authors[number % len(authors)],
+                name=f'Рецепт {number}', text='Описание',
+                cooking_time=number + 1, image='recipes/images/test.gif',
+            )
+            recipe.tags.set(tags[:number % len(tags) + 1])
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(recipe=recipe, ingredient=ingredient,
+                                 amount=number + 1)
+                for ingredient in ingredients[:number % 3 + 1]
+            )
+            if number % 2:
+                Favorite.objects.create(user=cls.viewer, recipe=recipe)
+            if number % 3:
+                ShoppingCart.objects.create(user=cls.viewer, recipe=recipe)
+
+    def clients(self):
+        viewer = APIClient()
+        token, _ = Token.objects.get_or_create(user=self.viewer)
+        viewer.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return {'аноним': APIClient(), 'читатель': viewer}
+
+    def test_same_payload(self):
+        clients = self.clients()
+        for name, client in clients.items():
+            for url in CONTRACT_URLS:
+                with self.subTest(client=name, url=url):
+                    cache.clear()
+                    with override_settings(READ_PROJECTIONS=False):
+                        expected = client.get(url)
+                    with override_settings(READ_PROJECTIONS=True):
+                        actual = client.get(url)
+                    anonymous_subscriptions = (
+                        client is clients['аноним'] and 'subscriptions' in url
+                    )
+                    self.assertEqual(expected.status_code,
+                                     401 if anonymous_subscriptions else 200)
+                    self.assertEqual(actual.status_code,
+                                     expected.status_code)
+                    self.assertEqual(actual.content, expected.content)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer побайтово совпадает со стандартным JSONRenderer."""
+
+    payloads = {
+        'простые типы': {'id': 1, 'name': 'Борщ', 'ok': True, 'none': None,
+                         'list': [1, 'два', [3]], 'big': 2 ** 70},
+        'даты и uuid': {'date': datetime.date(2024, 1, 2),
+                        'at': datetime.datetime(2024, 1, 2, 3, 4, 5, 6789),
+                        'uuid': uuid.UUID(int=1)},
+        'дробные': {'values': [1e-05, 1e+16, 0.1, -0.0, 123456789.125],
+                    'nested': [{'score': 0.333}]},
+        'decimal': {'amount': Decimal('1.10'), 'total': Decimal('1e3')},
+        'разделители строк': {'text': 'a\u2028b\u2029c'},
+    }
+
+    def assert_same_output(self, fast, standard, data, media_type=None,
+                           context=None):
+        self.assertEqual(fast.render(data, media_type, context),
+                         standard.render(data, media_type, context))
+
+    def test_payloads(self):
+        for name, data in self.payloads.items():
+            with self.subTest(payload=name):
+                self.assert_same_output(FastJSONRenderer(), JSONRenderer(),
+                                        data)
+
+    def test_ensure_ascii(self):
+        fast = type('ASCIIRenderer', (FastJSONRenderer,),
+                    {'ensure_ascii': True})()
+        standard = type('ASCIIRenderer', (JSONRenderer,),
+                        {'ensure_ascii': True})()
+        self.assert_same_output(fast, standard, self.payloads['простые типы'])
+
+    def test_indent(self):
+        data = self.payloads['простые типы']
+        with self.subTest(source='media type'):
+            self.assert_same_output(FastJSONRenderer(), JSONRenderer(),
+                                    data, 'application/json; indent=4')
+        with self.subTest(source='context'):
+            self.assert_same_output(FastJSONRenderer(), JSONRenderer(),
+                                    data, context={'indent': 2})
+
+    def test_non_finite_floats_rejected(self):
+        for value in (math.nan, math.inf):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render({'value': value})
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render({'value': value})
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """FastJSONParser разбирает и отклоняет JSON как JSONParser."""
+
+    def parse(self, parser, body):
+        return parser.parse(BytesIO(body), 'application/json', {})
+
+    def test_valid(self):
+        body = json.dumps({'name': 'Щи', 'amount': 1.5, 'tags': [1, 2]},
+                          ensure_ascii=False).encode()
+        self.assertEqual(self.parse(FastJSONParser(), body),
+                         self.parse(JSONParser(), body))
+
+    def test_invalid(self):
+        for body in (b'{"name": ', b'{"a": NaN', b'\xff'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as standard:
+                    self.parse(JSONParser(), body)
+                with self.assertRaises(ParseError) as fast:
+                    self.parse(FastJSONParser(), body)
+                self.assertEqual(str(fast.exception.detail),
+                                 str(standard.exception.detail))
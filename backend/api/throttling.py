@@ -0,0 +1,103 @@
+"""Ограничение частоты запросов с учётом их стоимости.
+
+Каждый клиент получает корзину из num токенов скорости 'num/period',
+которая равномерно пополняется за period. Запрос списывает столько
+токенов, сколько стоит: страница на 1000 рецептов дороже страницы на 6.
+Корзины лежат в кеше Django, поэтому с общим кешем ограничение
+действует на все воркеры.
+"""
+import math
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from api.fieldsets import split
+from recipes.models import ShoppingCart
+
+
+class CostRateThrottle(SimpleRateThrottle):
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+
+    def __init__(self):
+        super().__init__()
+        self.wait_seconds = None
+
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def get_cost(self, request, view):
+        return 1
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        capacity, period = self.num_requests, self.duration
+        refill = capacity / period
+        self.now = self.timer()
+        tokens, updated = self.cache.get(self.key, (capacity, self.now))
+        tokens = min(capacity, tokens + (self.now - updated) * refill)
+        # Запрос дороже всей корзины иначе не прошёл бы никогда.
+        cost = min(self.get_cost(request, view), capacity)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        else:
+            self.wait_seconds = (cost - tokens) / refill
+        self.cache.set(self.key, (tokens, self.now), period)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class RecipeListThrottle(CostRateThrottle):
+    """Стоимость списка — число страниц стандартного размера."""
+
+    scope = 'recipes'
+    list_actions = ('list', 'feed', 'changes')
+
+    def get_cost(self, request, view):
+        if getattr(view, 'action', None) not in self.list_actions:
+            return 1
+        default = settings.REST_FRAMEWORK['PAGE_SIZE']
+        if 'ids' in request.query_params:
+            ids = split(request.query_params['ids'])
+            return max(1, math.ceil(len(ids) / default))
+        try:
+            limit = int(request.query_params.get('limit', default))
+        except ValueError:
+            return 1
+        return max(1, math.ceil(limit / default))
+
+
+class ShoppingCartThrottle(CostRateThrottle):
+    """Стоимость выгрузки растёт с числом рецептов в корзине."""
+
+    scope = 'shopping_cart'
+    recipes_per_token = 10
+
+    def get_cost(self, request, view):
+        if not request.user.is_authenticated:
+            return 1
+        recipes = ShoppingCart.objects.filter(user=request.user).count()
+        return 1 + recipes // self.recipes_per_token
+
+
+class IngredientSearchThrottle(CostRateThrottle):
+    """Короткий префикс поиска совпадает с большей частью справочника."""
+
+    scope = 'ingredient_search'
+    broad_prefix_length = 3
+
+    def get_cost(self, request, view):
+        name = request.query_params.get('name', '').strip()
+        if not name:
+            return 1
+        return max(1, self.broad_prefix_length + 1 - len(name))
@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
+from django.urls.resolvers import URLPattern
 from rest_framework.routers import DefaultRouter
 
 from api import views
+from api.async_views import async_read_view
 
 app_name = 'api'
 
@@ -11,8 +14,31 @@ router.register('tags', views.TagViewSet, basename='tags')
 router.register('ingredients', views.IngredientViewSet, basename='ingredients')
 router.register('recipes', views.RecipeViewSet, basename='recipes')
 
+ASYNC_READ_ROUTES = (
+    'recipes-list', 'recipes-detail',
+    'ingredients-list', 'ingredients-detail',
+    'tags-list', 'tags-detail',
+)
+
+
+def async_routes(patterns):
+    return [
+        URLPattern(pattern.pattern, async_read_view(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if getattr(pattern, 'name', None) in ASYNC_READ_ROUTES
+        else pattern
+        for pattern in patterns
+    ]
+
+
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_routes(router_urls)
+
 urlpatterns = [
+    path('metrics/', views.RequestStatsView.as_view(), name='metrics'),
     path('auth/', include('djoser.urls.authtoken')),
-    path('', include(router.urls)),
-    path('', include('djoser.urls')),
+    path('recipes/exchange/', views.RecipeExchangeView.as_view(),
+         name='recipes-exchange'),
+    path('', include(router_urls)),
 ]
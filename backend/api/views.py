@@ -1,28 +1,59 @@
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from djoser.views import UserViewSet as DjoserUserViewSet
+from recipes.deletion import schedule_user_deletion
+from recipes.exchange import Importer, export_recipes
+from recipes.minhash import similar_recipes
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeChange,
+                            ShoppingCart, SimilarRecipe, Tag)
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
+                                        SAFE_METHODS)
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 
+from api.cache import (catalog, recipe_item_keys, recipe_list_key,
+                       recipe_versions)
+from api.conditional import filter_signature, make_validators
+from api.facets import facets
+from api.feed import backfill, feed_positions, unfollow
+from api.fieldsets import recipe_fieldset, split, subscription_fieldset
 from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import Pagination
+from api.pagination import (FollowerPagination, KeysetPagination,
+                            Pagination)
 from api.permissions import IsAuthorOrReadOnly
+from api.throttling import (IngredientSearchThrottle, RecipeListThrottle,
+                            ShoppingCartThrottle)
+from api.sync import changes_after, pruned_until
 from api.serializers import (FollowSerializer, IngredientSerializer,
-                             RecipeCreateSerializer,
-                             RecipeReadSerializer, TagSerializer,
+                             RecipeCreateSerializer, RecipeReadSerializer,
+                             RecipeShortSerializer, TagSerializer,
                              UserSerializer)
+from api.instrumentation import registry
 from api.mixins import AddDeleteMixin
+from api.projections import (apply_flags, follower_positions, get_viewer,
+                             project_followers, project_ingredient_list,
+                             project_recipes, project_subscriptions,
+                             subscribed_authors, subscription_authors,
+                             viewer_flags)
 from users.models import Follow, User
 
 
-class UserViewSet(viewsets.GenericViewSet):
+class UserViewSet(DjoserUserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = Pagination
     search_fields = ('username',)
+    lookup_url_kwarg = 'pk'
+
+    def perform_destroy(self, instance):
+        schedule_user_deletion(instance)
 
     @action(
         detail=False,
@@ -31,13 +62,39 @@ class UserViewSet(viewsets.GenericViewSet):
     )
     def subscriptions(self, request,):
         user = request.user
-        queryset = User.objects.filter(following__user=user)
-        page = self.paginate_queryset(queryset)
+        fieldset = subscription_fieldset(request)
+        if settings.READ_PROJECTIONS:
+            recipes_limit = request.GET.get('recipes_limit')
+            page = self.paginate_queryset(subscription_authors(user))
+            return self.get_paginated_response(project_subscriptions(
+                page, request, int(recipes_limit) if recipes_limit else None,
+                fieldset,
+            ))
+        page = self.paginate_queryset(subscribed_authors(user))
         serializer = FollowSerializer(
-            page, many=True, context={'request': request}
+            page, many=True,
+            context={'request': request, 'fieldset': fieldset},
         )
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=True,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+    )
+    def followers(self, request, pk=None):
+        author = get_object_or_404(User, pk=pk)
+        paginator = FollowerPagination()
+        positions = paginator.paginate_positions(
+            lambda position, limit: follower_positions(
+                author.id, position, limit
+            ),
+            request,
+        )
+        return paginator.get_paginated_response(project_followers(
+            [user_id for _, user_id in positions], author.id, request
+        ))
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
@@ -52,11 +109,13 @@ class UserViewSet(viewsets.GenericViewSet):
             )
             serializer.is_valid(raise_exception=True)
             Follow.objects.create(user=request.user, author=author)
+            backfill(request.user, author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if request.method == 'DELETE':
             subscription = get_object_or_404(
                 Follow, user=request.user, author=author)
             subscription.delete()
+            unfollow(request.user, author)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
@@ -66,6 +125,11 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        if not settings.READ_PROJECTIONS:
+            return super().list(request, *args, **kwargs)
+        return Response(catalog.get_tags())
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
@@ -73,6 +137,15 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (IngredientFilter,)
     search_fields = ('^name',)
     pagination_class = None
+    throttle_classes = (IngredientSearchThrottle,)
+
+    def list(self, request, *args, **kwargs):
+        if not settings.READ_PROJECTIONS:
+            return super().list(request, *args, **kwargs)
+        if not request.query_params.get(IngredientFilter.search_param):
+            return Response(catalog.get_ingredients())
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(project_ingredient_list(queryset))
 
 
 class RecipeViewSet(viewsets.ModelViewSet, AddDeleteMixin):
@@ -81,6 +154,7 @@ class RecipeViewSet(viewsets.ModelViewSet, AddDeleteMixin):
     pagination_class = Pagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    throttle_classes = (RecipeListThrottle,)
     ordering = ('-id',)
 
     def get_serializer_class(self):
@@ -88,6 +162,223 @@ class RecipeViewSet(viewsets.ModelViewSet, AddDeleteMixin):
             return RecipeReadSerializer
         return RecipeCreateSerializer
 
+    def serialize_recipes(self, ids, request):
+        fieldset = recipe_fieldset(request)
+        if settings.READ_PROJECTIONS:
+            return project_recipes(ids, request, fieldset)
+        recipes = self.fieldset_queryset(fieldset).in_bulk(ids)
+        return RecipeReadSerializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True,
+            context={'request': request, 'fieldset': fieldset,
+                     **viewer_flags(get_viewer(request), ids, fieldset)},
+        ).data
+
+    @staticmethod
+    def fieldset_queryset(fieldset):
+        """Подгружает только связи, которые попадут в ответ."""
+        queryset = Recipe.objects.all()
+        if 'text' not in fieldset:
+            queryset = queryset.defer('text')
+        if fieldset.expanded('author'):
+            queryset = queryset.select_related('author')
+        if 'tags' in fieldset:
+            queryset = queryset.prefetch_related('tags')
+        if fieldset.expanded('ingredients'):
+            queryset = queryset.prefetch_related(
+                'recipe_ingredients__ingredient'
+            )
+        elif 'ingredients' in fieldset:
+            queryset = queryset.prefetch_related('recipe_ingredients')
+        return queryset
+
+    @staticmethod
+    def requested_ids(request):
+        values = split(request.query_params['ids'])
+        # isdigit() пропускает «²», которые int() не разбирает.
+        if not all(value.isdecimal() for value in values):
+            raise ValidationError({'ids': 'Ожидаются id через запятую.'})
+        ids = list(dict.fromkeys(int(value) for value in values))
+        if len(ids) > settings.RECIPE_BULK_LIMIT:
+            raise ValidationError({
+                'ids': f'Не больше {settings.RECIPE_BULK_LIMIT} '
+                       f'рецептов за запрос.'
+            })
+        return ids
+
+    def list_by_ids(self, request):
+        """Рецепты ?ids=1,2,3 в порядке запроса и список ненайденных.
+
+        Общие для всех пользователей части берутся из кеша get_many,
+        промахи сериализуются одним in_bulk с prefetch, флаги текущего
+        пользователя досчитываются на все рецепты сразу.
+        """
+        ids = self.requested_ids(request)
+        fieldset = recipe_fieldset(request)
+        keys = recipe_item_keys(request, fieldset, recipe_versions(ids))
+        cached = cache.get_many(keys.values())
+        payloads = {pk: cached[key] for pk, key in keys.items()
+                    if key in cached}
+        misses = [pk for pk in keys if pk not in payloads]
+        if misses:
+            recipes = self.fieldset_queryset(fieldset).in_bulk(misses)
+            fresh = {
+                recipe['id']: recipe
+                for recipe in RecipeReadSerializer(
+                    list(recipes.values()), many=True,
+                    context={'request': request, 'fieldset': fieldset,
+                             **viewer_flags(None, misses)},
+                ).data
+            }
+            cache.set_many({keys[pk]: recipe for pk, recipe in fresh.items()},
+                           settings.RECIPE_CACHE_TTL)
+            payloads.update(fresh)
+        flags = viewer_flags(get_viewer(request), list(payloads), fieldset)
+        return Response({
+            'results': [apply_flags(payloads[pk], flags)
+                        for pk in ids if pk in payloads],
+            'missing': [pk for pk in ids if pk not in payloads],
+        })
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return self.list_by_ids(request)
+        key = recipe_list_key(request) if settings.READ_PROJECTIONS else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                data, validators = cached
+                return (validators.not_modified(request)
+                        or validators.apply(Response(data)))
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = queryset.values_list('id', flat=True)
+        page = self.paginate_queryset(ids)
+        ids = list(ids if page is None else page)
+        if page is None:
+            count = len(ids)
+        else:
+            count = self.paginator.page.paginator.count
+        counts = facets(request)
+        # Счётчики фасетов зависят и от рецептов вне страницы.
+        validators = make_validators(
+            request, Recipe.objects.filter(id__in=ids),
+            (filter_signature(request), count, ids, counts),
+        )
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        data = self.serialize_recipes(ids, request)
+        if page is None:
+            response = Response(
+                {'results': data, 'facets': counts} if counts else data
+            )
+        else:
+            response = self.get_paginated_response(data)
+            if counts:
+                response.data['facets'] = counts
+        if key is not None:
+            cache.set(key, (response.data, validators),
+                      settings.RECIPE_LIST_CACHE_TTL)
+        return validators.apply(response)
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        validators = make_validators(
+            request, Recipe.objects.filter(pk=recipe.pk),
+            filter_signature(request),
+        )
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        data = self.serialize_recipes([recipe.pk], request)[0]
+        return validators.apply(Response(data))
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request):
+        paginator = KeysetPagination()
+        positions = paginator.paginate_positions(
+            lambda position, limit: feed_positions(
+                request.user, position, limit
+            ),
+            request,
+        )
+        ids = [recipe_id for _, recipe_id in positions]
+        return paginator.get_paginated_response(
+            self.serialize_recipes(ids, request)
+        )
+
+    @action(detail=False, methods=['GET'])
+    def changes(self, request):
+        since = request.query_params.get('since', '0')
+        if not since.isdecimal():
+            raise ValidationError({'since': 'Неверный водяной знак.'})
+        since = int(since)
+        pruned = pruned_until()
+        if since < pruned:
+            # Записи журнала после pruned сохранены: после полной
+            # синхронизации клиент продолжает с этого водяного знака.
+            return Response(
+                {'detail': 'Журнал изменений очищен, выполните полную '
+                           'синхронизацию и продолжите с since.',
+                 'since': str(pruned)},
+                status=status.HTTP_410_GONE,
+            )
+        paginator = KeysetPagination()
+        limit = paginator.get_page_size(request)
+        changes, watermark, has_more = changes_after(since, limit)
+        alive = [recipe_id for recipe_id, change in changes
+                 if change != RecipeChange.DELETED]
+        payloads = {recipe['id']: recipe
+                    for recipe in self.serialize_recipes(alive, request)}
+        results = []
+        for recipe_id, change in changes:
+            recipe = payloads.get(recipe_id)
+            if recipe is None:
+                change = RecipeChange.DELETED
+            results.append({'id': recipe_id, 'action': change,
+                            'recipe': recipe})
+        next_link = None
+        if has_more:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), 'since', watermark
+            )
+        return Response({'since': str(watermark), 'next': next_link,
+                         'results': results})
+
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = settings.SIMILAR_RECIPES_LIMIT
+        neighbours = (SimilarRecipe.objects.filter(recipe=recipe)
+                      .select_related('neighbour')[:max(limit, 0)])
+        serializer = RecipeShortSerializer(
+            [link.neighbour for link in neighbours], many=True,
+            context={'request': request},
+        )
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['GET'])
+    def variations(self, request, pk):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        try:
+            threshold = float(request.query_params['threshold'])
+        except (KeyError, ValueError):
+            threshold = settings.MINHASH_THRESHOLD
+        matches = similar_recipes(recipe.id, threshold,
+                                  settings.SIMILAR_RECIPES_LIMIT)
+        recipes = Recipe.objects.in_bulk([pk for pk, _ in matches])
+        serializer = RecipeShortSerializer(
+            [recipes[pk] for pk, _ in matches if pk in recipes], many=True,
+            context={'request': request},
+        )
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
@@ -116,6 +407,7 @@ class RecipeViewSet(viewsets.ModelViewSet, AddDeleteMixin):
         detail=False,
         methods=['GET'],
         permission_classes=[IsAuthenticated],
+        throttle_classes=(ShoppingCartThrottle,),
     )
     def download_shopping_cart(self, request) -> HttpResponse:
         list_ingredients = Recipe.get_detail_recipe(request.user)
@@ -123,3 +415,38 @@ class RecipeViewSet(viewsets.ModelViewSet, AddDeleteMixin):
         response = HttpResponse(list_ingredients, content_type='text/plain')
         response['Content-Disposition'] = f'attachment; filename={name}'
         return response
+
+
+class RequestStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        if request.query_params.get('output') == 'prometheus':
+            return HttpResponse(
+                registry.prometheus(),
+                content_type='text/plain; version=0.0.4; charset=utf-8',
+            )
+        return Response(registry.snapshot())
+
+
+class RecipeExchangeView(APIView):
+    """NDJSON-выгрузка (GET) и загрузка (POST) рецептов для персонала."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        queryset = Recipe.objects.all()
+        author = request.query_params.get('author')
+        if author:
+            queryset = queryset.filter(author__email=author)
+        return StreamingHttpResponse(
+            export_recipes(
+                queryset,
+                embed_images=request.query_params.get('images') == '1',
+            ),
+            content_type='application/x-ndjson',
+        )
+
+    def post(self, request):
+        importer = Importer(default_author=request.user.id)
+        return Response(importer.run(request.stream or ()))
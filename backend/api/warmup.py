@@ -0,0 +1,52 @@
+"""Прогрев процесса перед fork воркеров gunicorn."""
+import gc
+import importlib
+import logging
+import time
+
+from django.db import connections
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODULES = (
+    'api.views', 'api.serializers', 'api.filters', 'api.projections',
+    'djoser.views', 'djoser.serializers', 'rest_framework.authtoken.views',
+    'django.contrib.admin.sites', 'django.contrib.auth.backends',
+    'django.contrib.sessions.backends.db', 'recipes.storage',
+)
+
+
+def warm_up():
+    """Импорты, URL-резолвер и справочники; возвращает время этапов, с."""
+    from api.cache import catalog
+
+    timings = {}
+    started = time.perf_counter()
+    for module in WARMUP_MODULES:
+        importlib.import_module(module)
+    timings['imports'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    # reverse() заполняет кеши резолвера всех подключённых URLconf.
+    reverse('api:recipes-list')
+    timings['urls'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        catalog.load()
+    except Exception:
+        # База может быть ещё не готова или без миграций при первом
+        # деплое: воркеры стартуют с холодным каталогом и загрузят его
+        # при первом запросе.
+        logger.warning('Прогрев каталога пропущен', exc_info=True)
+    else:
+        timings['catalog'] = time.perf_counter() - started
+
+    # Соединения мастера нельзя наследовать воркерам.
+    connections.close_all()
+    # Всё созданное до fork не трогается сборщиком мусора, и страницы
+    # памяти остаются общими между воркерами.
+    gc.collect()
+    gc.freeze()
+    return timings
@@ -28,9 +28,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestStatsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,6 +41,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -105,9 +109,26 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     "SEARCH_PARAM": "name",
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.Pagination',
     'PAGE_SIZE': 6,
+    # Cost-weighted token buckets, see api/throttling.py
+    'DEFAULT_THROTTLE_RATES': {
+        'recipes': os.getenv('THROTTLE_RECIPES', default='600/min'),
+        'shopping_cart': os.getenv('THROTTLE_SHOPPING_CART',
+                                   default='30/min'),
+        'ingredient_search': os.getenv('THROTTLE_INGREDIENT_SEARCH',
+                                       default='300/min'),
+    },
 }
 
 
@@ -144,8 +165,129 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media'
 
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+# Release replaced and deleted recipe images from storage
+MEDIA_DELETE_ON_CHANGE = bool(
+    strtobool(os.getenv('MEDIA_DELETE_ON_CHANGE', default='True'))
+)
+MEDIA_QUARANTINE_DIR = 'quarantine'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# values()-based read projections for hot list endpoints
+READ_PROJECTIONS = bool(
+    strtobool(os.getenv('READ_PROJECTIONS', default='True'))
+)
+
+# LocMemCache is per process: cache versions (catalog, recipe lists,
+# facets) and throttle buckets are not shared between gunicorn workers.
+# Use a shared backend with several workers, e.g.
+# CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+# and CACHE_LOCATION=memcached:11211 (requires pymemcache).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+# In-process tag and ingredient catalog, shared by forked workers
+CATALOG_TTL = 300
+# Anonymous first pages of the recipe list
+RECIPE_LIST_CACHE_TTL = 60
+# Tag counts for filtered recipe lists (?facets=tags)
+RECIPE_FACETS_CACHE_TTL = 300
+# Recipes fetched by id list: shared payloads without viewer flags
+RECIPE_CACHE_TTL = 300
+RECIPE_BULK_LIMIT = 100
+WARM_CACHE_PAGES = 3
+
+# Set-based deletion of users and recipes (recipes.deletion)
+DELETION_BATCH_SIZE = 1000
+# Authors with more recipes are deleted by a background job
+DELETION_SYNC_LIMIT = int(os.getenv('DELETION_SYNC_LIMIT', default=200))
+
+# Delta sync (/recipes/changes/)
+# Journal entries younger than this are held back until concurrent
+# transactions with lower ids have committed
+RECIPE_CHANGES_SETTLE = int(os.getenv('RECIPE_CHANGES_SETTLE', default=2))
+RECIPE_CHANGES_RETENTION_DAYS = 30
+
+# Following feed
+# Authors with more followers are merged into feeds at read time
+FEED_CELEBRITY_FOLLOWERS = int(
+    os.getenv('FEED_CELEBRITY_FOLLOWERS', default=10000)
+)
+# How long the set of such authors is cached, seconds
+FEED_CELEBRITIES_TTL = 300
+# Larger fan-outs are written by a background job
+FEED_FANOUT_SYNC_LIMIT = int(os.getenv('FEED_FANOUT_SYNC_LIMIT', default=500))
+FEED_BATCH_SIZE = 1000
+FEED_BACKFILL = 50
+
+# Background jobs (run_worker)
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 3600
+# Running jobs refresh locked_at every JOBS_HEARTBEAT_INTERVAL seconds;
+# jobs not refreshed for JOBS_LOCK_TIMEOUT seconds are requeued
+JOBS_HEARTBEAT_INTERVAL = 60
+JOBS_LOCK_TIMEOUT = 600
+JOBS_POLL_INTERVAL = 1
+JOBS_REQUEUE_INTERVAL = 60
+
+# Co-favorite recommendations (compute_similar)
+SIMILAR_RECIPES_TOP_K = 20
+SIMILAR_RECIPES_LIMIT = 10
+
+# Ingredient-based near duplicates (MinHash + LSH)
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 32
+MINHASH_THRESHOLD = 0.5
+MINHASH_SEED = 20231210
+
+# Async read path (ASGI)
+ASYNC_READ_VIEWS = bool(
+    strtobool(os.getenv('ASYNC_READ_VIEWS', default='False'))
+)
+ASYNC_READ_THREADS = int(os.getenv('ASYNC_READ_THREADS', default=8))
+
+# Response compression (gzip, brotli when installed)
+COMPRESSION_ENABLED = bool(
+    strtobool(os.getenv('COMPRESSION', default='True'))
+)
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_CACHE_TTL = 300
+COMPRESSION_CONTENT_TYPES = ('application/json', 'application/x-ndjson',
+                             'text/')
+
+# Request instrumentation
+REQUEST_STATS_ENABLED = bool(
+    strtobool(os.getenv('REQUEST_STATS', default='True'))
+)
+REQUEST_STATS_SERVER_TIMING = bool(
+    strtobool(os.getenv('SERVER_TIMING', default='False'))
+)
+REQUEST_STATS_WINDOW = 500
+REQUEST_STATS_SLOW_MS = 500
+REQUEST_STATS_DUPLICATE_QUERIES = 3
+
+# On-demand request profiler (?_profile=1), only for active staff users
+# whose emails are listed in PROFILER_ALLOWED_USERS
+PROFILER_ENABLED = bool(strtobool(os.getenv('PROFILER', default='False')))
+PROFILER_ALLOWED_USERS = tuple(
+    email.strip()
+    for email in os.getenv('PROFILER_ALLOWED_USERS', default='').split(',')
+    if email.strip()
+)
+PROFILER_INTERVAL = 0.002
+# Directory for .folded stacks and SQL breakdowns, not stored when empty
+PROFILER_DIR = os.getenv('PROFILER_DIR', default='')
+
 NAME_MAX_LENGTH = 25
 MIN_VALUE = 1
 MAX_VALUE_AMOUNT = 1000
@@ -0,0 +1,35 @@
+import os
+from distutils.util import strtobool
+
+# Профили запуска: wsgi — синхронные воркеры, asgi — uvicorn-воркеры
+# с асинхронным путём чтения для рецептов, ингредиентов и тегов.
+profile = os.getenv('GUNICORN_PROFILE', 'wsgi')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8100')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+# Приложение загружается и прогревается в мастере до fork.
+preload_app = bool(strtobool(os.getenv('GUNICORN_PRELOAD', 'True')))
+
+if profile == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    raw_env = ['ASYNC_READ_VIEWS=True']
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+
+def when_ready(server):
+    backend = os.getenv('CACHE_BACKEND', 'LocMemCache')
+    if workers > 1 and backend.endswith('LocMemCache'):
+        server.log.warning(
+            'LocMemCache у каждого воркера свой: версии кешей и корзины '
+            'ограничения частоты не общие, задайте CACHE_BACKEND.'
+        )
+    if not preload_app:
+        return
+    from api.warmup import warm_up
+    timings = warm_up()
+    server.log.info('Прогрев: %s', ', '.join(
+        f'{stage} {seconds * 1000:.0f} мс'
+        for stage, seconds in timings.items()
+    ))
@@ -0,0 +1,25 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts',
+                    'run_at', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    readonly_fields = ('created_at', 'finished_at', 'locked_at', 'locked_by',
+                       'last_error')
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+    actions = ('retry',)
+
+    @admin.action(description='Перезапустить')
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, run_at=timezone.now(), attempts=0,
+            locked_at=None, locked_by='', finished_at=None,
+        )
+        self.message_user(request, f'Поставлено в очередь: {updated}')
@@ -0,0 +1,47 @@
+"""Регистрация и постановка фоновых задач.
+
+    @task
+    def fan_out(recipe_id): ...
+
+    enqueue_on_commit(fan_out, recipe_id=recipe.id)
+
+Аргументы хранятся в JSON, поэтому передавать нужно id, а не объекты.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.models import Job
+
+registry = {}
+
+
+def task(func=None, *, max_attempts=None):
+    """Регистрирует функцию как задачу под именем module.function."""
+
+    def register(func):
+        func.job_name = f'{func.__module__}.{func.__qualname__}'
+        func.max_attempts = max_attempts or settings.JOBS_MAX_ATTEMPTS
+        registry[func.job_name] = func
+        return func
+
+    return register(func) if func is not None else register
+
+
+def enqueue(func, delay=None, **payload):
+    run_at = timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+    return Job.objects.create(name=func.job_name, payload=payload,
+                              max_attempts=func.max_attempts, run_at=run_at)
+
+
+def enqueue_on_commit(func, delay=None, **payload):
+    """Ставит задачу после фиксации текущей транзакции.
+
+    Если транзакция откатится, задача не появится и не увидит
+    несохранённых данных.
+    """
+    transaction.on_commit(lambda: enqueue(func, delay, **payload))
@@ -0,0 +1,171 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DatabaseError, close_old_connections, connection,
+                       transaction)
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from jobs.models import Job
+from jobs.tasks import registry
+
+logger = logging.getLogger(__name__)
+
+
+def worker_name():
+    return (f'{socket.gethostname()}:{os.getpid()}:'
+            f'{threading.current_thread().name}')
+
+
+def backoff(attempts):
+    """Экспоненциальная задержка с разбросом, секунды."""
+    delay = min(settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+                settings.JOBS_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class Heartbeat:
+    """Продлевает locked_at выполняемой задачи каждые interval секунд.
+
+    Долгая задача остаётся свежей для requeue_stale, а задача упавшего
+    воркера перестаёт продлеваться и через JOBS_LOCK_TIMEOUT
+    возвращается в очередь.
+    """
+
+    def __init__(self, job_id, interval):
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True,
+                                        name=f'job-heartbeat-{job_id}')
+
+    def run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    Job.objects.filter(
+                        id=self.job_id, status=Job.RUNNING
+                    ).update(locked_at=timezone.now())
+                except DatabaseError:
+                    logger.warning('Не удалось продлить задачу #%d',
+                                   self.job_id, exc_info=True)
+        finally:
+            # У потока своё соединение с БД.
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, которые давно не продлевались.
+
+    Выполняемые задачи продлевает Heartbeat, поэтому сюда попадают
+    только задачи воркеров, завершившихся аварийно.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    return Job.objects.filter(status=Job.RUNNING,
+                              locked_at__lt=deadline).update(
+        status=Job.QUEUED, locked_at=None, locked_by='',
+    )
+
+
+def claim(worker, limit=1):
+    """Забирает готовые задачи; занятые другими воркерами пропускаются."""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by('run_at', 'id')[:limit]
+        )
+        if jobs:
+            Job.objects.filter(id__in=[job.id for job in jobs]).update(
+                status=Job.RUNNING, locked_at=now, locked_by=worker,
+                attempts=F('attempts') + 1,
+            )
+    return jobs
+
+
+def resolve(name):
+    func = registry.get(name)
+    if func is None:
+        # Регистрация происходит при импорте модуля задачи.
+        import_string(name)
+        func = registry.get(name)
+    if func is None:
+        raise LookupError(f'Задача {name} не зарегистрирована.')
+    return func
+
+
+def execute(job):
+    attempts = job.attempts + 1
+    try:
+        with Heartbeat(job.id, settings.JOBS_HEARTBEAT_INTERVAL):
+            resolve(job.name)(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Задача %s #%d упала (попытка %d/%d)', job.name,
+                       job.id, attempts, job.max_attempts)
+        if attempts >= job.max_attempts:
+            Job.objects.filter(id=job.id).update(
+                status=Job.FAILED, last_error=error,
+                finished_at=timezone.now(),
+            )
+            return False
+        Job.objects.filter(id=job.id).update(
+            status=Job.QUEUED, last_error=error, locked_at=None,
+            locked_by='',
+            run_at=timezone.now() + timedelta(seconds=backoff(attempts)),
+        )
+        return False
+    Job.objects.filter(id=job.id).update(status=Job.DONE,
+                                         finished_at=timezone.now())
+    return True
+
+
+def work(stop, burst=False, poll_interval=None):
+    """Цикл одного потока воркера до события stop."""
+    poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+    name = worker_name()
+    processed = 0
+    # Зависшие задачи при старте возвращает run_worker, дальше — цикл.
+    requeued_at = time.monotonic()
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            if (time.monotonic() - requeued_at
+                    >= settings.JOBS_REQUEUE_INTERVAL):
+                requeued_at = time.monotonic()
+                requeued = requeue_stale()
+                if requeued:
+                    logger.warning('Возвращено в очередь зависших задач: %d',
+                                   requeued)
+            jobs = claim(name)
+        except DatabaseError:
+            logger.exception('Не удалось получить задачи')
+            stop.wait(poll_interval)
+            continue
+        if not jobs:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        for job in jobs:
+            execute(job)
+            processed += 1
+    close_old_connections()
+    return processed
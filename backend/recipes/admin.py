@@ -1,13 +1,23 @@
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
 
+from recipes.admin_filters import AuthorFilter, RecipeIdFilter, UserFilter
+from recipes.admin_mixins import BulkDeleteMixin
+from recipes.deletion import delete_recipes
+from recipes.minhash import similar_recipes
 from recipes.models import (Favorite, Ingredient, Recipe,
                             IngredientAmount, ShoppingCart, Tag)
 
 
 class RecipeIngredientsInLine(admin.TabularInline):
     model = IngredientAmount
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Tag)
@@ -24,7 +34,7 @@ class TagAdmin(admin.ModelAdmin):
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit')
     search_fields = ('name', 'measurement_unit')
-    list_filter = ('name', 'measurement_unit')
+    list_filter = ('measurement_unit',)
     ordering = ('name',)
     empty_value_display = '-пусто-'
 
@@ -43,21 +53,48 @@ class RecipeAdminForm(forms.ModelForm):
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(BulkDeleteMixin, admin.ModelAdmin):
     form = RecipeAdminForm
     list_display = ('id', 'name', 'author', 'text',
                     'cooking_time', 'image_tag',
                     'favorite_count', 'pub_date')
     list_display_links = ('name',)
-    search_fields = ('name', 'author', 'text', 'cooking_time')
-    list_filter = ('name', 'author', 'tags')
+    search_fields = ('name', 'author__username', 'author__email')
+    list_filter = (AuthorFilter, 'tags')
+    list_select_related = ('author',)
+    autocomplete_fields = ('author', 'tags')
+    show_full_result_count = False
     readonly_fields = ('favorite_count',)
     inlines = (RecipeIngredientsInLine,)
     ordering = ('-pub_date',)
     empty_value_display = '-пусто-'
+    actions = ('find_duplicates',)
+    queryset_deleter = staticmethod(delete_recipes)
+
+    def get_queryset(self, request):
+        # Коррелированный подзапрос вместо JOIN с GROUP BY: запросы
+        # подсчёта и пагинации списка не соединяются с Favorite.
+        favorites = (Favorite.objects.filter(recipe=OuterRef('pk'))
+                     .order_by().values('recipe')
+                     .annotate(total=Count('*')).values('total'))
+        return super().get_queryset(request).annotate(
+            favorites_total=Coalesce(Subquery(favorites), 0)
+        )
 
+    @admin.action(description='Найти похожие по ингредиентам')
+    def find_duplicates(self, request, queryset):
+        for recipe in queryset:
+            matches = similar_recipes(recipe.id)
+            if not matches:
+                continue
+            self.message_user(request, '{}: {}'.format(
+                recipe.name,
+                ', '.join(f'#{pk} ({score:.0%})' for pk, score in matches),
+            ), messages.WARNING)
+
+    @admin.display(description='В избранном', ordering='favorites_total')
     def favorite_count(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_total
 
     def image_tag(self, obj):
         return format_html(
@@ -73,8 +110,11 @@ class RecipeAdmin(admin.ModelAdmin):
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
-    search_fields = ('user', 'recipe')
-    list_filter = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    list_filter = (UserFilter, RecipeIdFilter)
+    list_select_related = ('user', 'recipe__author')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     ordering = ('id',)
     empty_value_display = '-пусто-'
 
@@ -82,7 +122,10 @@ class ShoppingCartAdmin(admin.ModelAdmin):
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
-    search_fields = ('user', 'recipe')
-    list_filter = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    list_filter = (UserFilter, RecipeIdFilter)
+    list_select_related = ('user', 'recipe__author')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     ordering = ('id',)
     empty_value_display = '-пусто-'
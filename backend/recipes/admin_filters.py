@@ -0,0 +1,50 @@
+from django.contrib import admin
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр с полем ввода вместо списка всех значений."""
+
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # Непустой список нужен, чтобы фильтр отображался.
+        return ((None, None),)
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        return queryset.filter(**{self.lookup: value.strip()})
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = (
+            (name, value)
+            for name, value in changelist.get_filters_params().items()
+            if name != self.parameter_name
+        )
+        yield all_choice
+
+
+class AuthorFilter(InputFilter):
+    title = 'автору (username)'
+    parameter_name = 'author'
+    lookup = 'author__username'
+
+
+class UserFilter(InputFilter):
+    title = 'пользователю (username)'
+    parameter_name = 'user'
+    lookup = 'user__username'
+
+
+class RecipeIdFilter(InputFilter):
+    title = 'id рецепта'
+    parameter_name = 'recipe'
+    lookup = 'recipe_id'
+
+    def queryset(self, request, queryset):
+        if self.value() and not self.value().strip().isdigit():
+            return queryset.none()
+        return super().queryset(request, queryset)
@@ -0,0 +1,94 @@
+from collections import Counter
+
+from django.contrib import messages
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet
+
+from recipes.deletion import cascade_relations
+
+
+SCHEDULED = 'scheduled'
+
+
+class BulkDeleteMixin:
+    """Удаление из админки через recipes.deletion вместо Collector.
+
+    Страница подтверждения показывает число строк по таблицам, а не
+    дерево всех зависимых объектов. Функция удаления задаётся
+    атрибутом класса через staticmethod: queryset_deleter(queryset)
+    возвращает число удалённых объектов модели, object_deleter(obj) —
+    {модель: число строк} или None, если удаление ушло в фоновую очередь.
+    """
+
+    queryset_deleter = None
+    object_deleter = None
+
+    def bulk_delete(self, queryset):
+        """Удаляет queryset, возвращает {модель: число строк}.
+
+        Под ключом SCHEDULED — число объектов, удаление которых
+        поставлено в фоновую очередь.
+        """
+        if self.queryset_deleter is not None:
+            return {self.model._meta.label: self.queryset_deleter(queryset)}
+        if self.object_deleter is None:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__}: задайте queryset_deleter '
+                f'или object_deleter.'
+            )
+        stats = Counter()
+        for obj in queryset:
+            deleted = self.object_deleter(obj)
+            if deleted is None:
+                stats[SCHEDULED] += 1
+            else:
+                stats.update(deleted)
+        return stats
+
+    def delete_model(self, request, obj):
+        self.report(request,
+                    self.bulk_delete(self.model.objects.filter(pk=obj.pk)))
+
+    def delete_queryset(self, request, queryset):
+        ids = list(queryset.values_list('pk', flat=True))
+        self.report(request,
+                    self.bulk_delete(self.model.objects.filter(pk__in=ids)))
+
+    def report(self, request, stats):
+        stats = dict(stats)
+        scheduled = stats.pop(SCHEDULED, 0)
+        if stats:
+            self.message_user(request, 'Удалено: {}'.format(', '.join(
+                f'{label} — {count}' for label, count in stats.items()
+            )), messages.SUCCESS)
+        if scheduled:
+            self.message_user(
+                request,
+                f'Удаление запланировано в фоне: '
+                f'{self.model._meta.verbose_name_plural} — {scheduled}.',
+                messages.WARNING,
+            )
+
+    def get_deleted_objects(self, objs, request):
+        if isinstance(objs, QuerySet):
+            ids = list(objs.values_list('pk', flat=True))
+        else:
+            ids = [obj.pk for obj in objs]
+        opts = self.model._meta
+        model_count = {opts.verbose_name_plural: len(ids)}
+        perms_needed = set()
+        for model, field in cascade_relations(self.model):
+            count = model.objects.filter(**{f'{field}__in': ids}).count()
+            if not count:
+                continue
+            related = model._meta
+            if related.auto_created:
+                continue
+            model_count[related.verbose_name_plural] = count
+            if not request.user.has_perm(
+                f'{related.app_label}.delete_{related.model_name}'
+            ):
+                perms_needed.add(related.verbose_name)
+        deleted_objects = [f'{name}: {count}'
+                           for name, count in model_count.items()]
+        return deleted_objects, model_count, perms_needed, []
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        import recipes.changelog  # noqa: F401
+        import recipes.tagstats  # noqa: F401
+        import recipes.versioning  # noqa: F401
+        if settings.MEDIA_DELETE_ON_CHANGE:
+            import recipes.signals  # noqa: F401
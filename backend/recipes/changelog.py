@@ -0,0 +1,34 @@
+"""Журнал изменений рецептов (RecipeChange).
+
+Создание и изменение через save() и удаление попадают в журнал через
+сигналы. Массовые операции в обход сигналов вызывают record() сами
+и отправляют recipes_created.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from recipes.models import Recipe, RecipeChange
+
+# Отправляется после массового создания рецептов в обход post_save,
+# аргументы: ids — список id.
+recipes_created = Signal()
+
+
+def record(recipe_ids, action):
+    RecipeChange.objects.bulk_create(
+        RecipeChange(recipe_id=recipe_id, action=action)
+        for recipe_id in recipe_ids
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    record([instance.pk],
+           RecipeChange.CREATED if created else RecipeChange.UPDATED)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    record([instance.pk], RecipeChange.DELETED)
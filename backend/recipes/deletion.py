@@ -0,0 +1,162 @@
+"""Удаление рецептов и пользователей пачками set-based запросами.
+
+Collector Django загружает в память все зависимые объекты и шлёт сигналы
+по каждому, поэтому удаление плодовитого автора занимает минуты и
+гигабайты. Здесь зависимые таблицы чистятся запросами
+DELETE ... WHERE id IN (SELECT id ... LIMIT n) по пачкам, а побочные
+эффекты сигналов Recipe выполняются один раз на пачку: надгробия в
+журнал изменений, сигнал recipes_deleted и фоновая очистка картинок.
+"""
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CASCADE, Count
+from django.dispatch import Signal
+
+from jobs.tasks import enqueue_on_commit, task
+from recipes import changelog
+from recipes.models import Recipe, RecipeChange
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+# Отправляется после удаления пачки рецептов в обход post_delete,
+# аргументы: ids — список id, tags — {id тега: число удалённых рецептов}.
+recipes_deleted = Signal()
+
+
+def cascade_relations(model):
+    """(модель, поле) таблиц, ссылающихся на model с on_delete=CASCADE.
+
+    Включает скрытые промежуточные таблицы ManyToMany.
+    """
+    return [
+        (relation.related_model, relation.field.name)
+        for relation in model._meta.get_fields(include_hidden=True)
+        if relation.auto_created and not relation.concrete
+        and (relation.one_to_many or relation.one_to_one)
+        and relation.on_delete is CASCADE
+    ]
+
+
+def delete_in_chunks(queryset, batch_size):
+    """Удаляет строки queryset пачками, каждая — отдельным DELETE.
+
+    Для моделей без сигналов и зависимых таблиц Django выполняет
+    DELETE без загрузки строк, иначе в память попадает одна пачка.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        chunk = model.objects.filter(
+            pk__in=queryset.order_by().values('pk')[:batch_size]
+        )
+        count = chunk.delete()[1].get(model._meta.label, 0)
+        if not count:
+            return deleted
+        deleted += count
+
+
+@task
+def release_images(names):
+    storage = Recipe._meta.get_field('image').storage
+    for name in names:
+        storage.delete(name)
+
+
+def delete_recipe_batch(rows, batch_size):
+    ids = [pk for pk, _ in rows]
+    with transaction.atomic():
+        tags = dict(
+            Recipe.tags.through.objects.filter(recipe_id__in=ids)
+            .order_by().values('tag_id').annotate(count=Count('recipe_id'))
+            .values_list('tag_id', 'count')
+        )
+        for model, field in cascade_relations(Recipe):
+            delete_in_chunks(model.objects.filter(**{f'{field}__in': ids}),
+                             batch_size)
+        # Зависимых строк не осталось, сигналы заменены кодом ниже.
+        recipes = Recipe.objects.filter(pk__in=ids)
+        recipes._raw_delete(recipes.db)
+        changelog.record(ids, RecipeChange.DELETED)
+        recipes_deleted.send(sender=Recipe, ids=ids, tags=tags)
+        names = [name for _, name in rows if name]
+        if settings.MEDIA_DELETE_ON_CHANGE and names:
+            enqueue_on_commit(release_images, names=names)
+
+
+def delete_recipes(queryset, batch_size=None, progress=None):
+    """Удаляет рецепты queryset, каждая пачка — в своей транзакции.
+
+    progress(count) вызывается после каждой пачки с её размером. При сбое
+    уже удалённые пачки остаются удалёнными, повторный вызов продолжит.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    deleted = 0
+    while True:
+        rows = list(queryset.order_by('pk').values_list('pk', 'image')
+                    [:batch_size])
+        if not rows:
+            return deleted
+        delete_recipe_batch(rows, batch_size)
+        deleted += len(rows)
+        if progress is not None:
+            progress(len(rows))
+
+
+def delete_users(queryset, batch_size=None, progress=None):
+    """Удаляет пользователей вместе с рецептами, подписками и списками.
+
+    Сначала пачками уходят рецепты и строки зависимых таблиц, строка
+    пользователя удаляется последней, поэтому прерванное удаление
+    можно запустить снова. progress(label, total) получает модель и
+    число удалённых из её таблицы строк.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    stats = Counter()
+
+    def count(label, deleted):
+        stats[label] += deleted
+        if progress is not None and deleted:
+            progress(label, stats[label])
+
+    for user_id in list(queryset.values_list('pk', flat=True)):
+        delete_recipes(
+            Recipe.objects.filter(author_id=user_id), batch_size,
+            lambda deleted: count(Recipe._meta.label, deleted),
+        )
+        for model, field in cascade_relations(User):
+            if model is not Recipe:
+                count(model._meta.label, delete_in_chunks(
+                    model.objects.filter(**{field: user_id}), batch_size
+                ))
+        User.objects.filter(pk=user_id).delete()
+        count(User._meta.label, 1)
+    return {label: count for label, count in stats.items() if count}
+
+
+@task
+def delete_user(user_id):
+    delete_users(
+        User.objects.filter(pk=user_id),
+        progress=lambda label, deleted: logger.info(
+            'Удаление пользователя %d: %s — %d', user_id, label, deleted
+        ),
+    )
+
+
+def schedule_user_deletion(user):
+    """Удаляет пользователя сразу или фоновой задачей, если рецептов много.
+
+    Возвращает статистику delete_users или None, если удаление
+    поставлено в очередь. До запуска задачи пользователь деактивирован
+    и не может войти.
+    """
+    recipes = Recipe.objects.filter(author=user)
+    if not recipes[settings.DELETION_SYNC_LIMIT:].exists():
+        return delete_users(User.objects.filter(pk=user.pk))
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    enqueue_on_commit(delete_user, user_id=user.pk)
+    return None
@@ -0,0 +1,319 @@
+"""Потоковый обмен рецептами в формате NDJSON (один рецепт на строку).
+
+{"name": ..., "text": ..., "cooking_time": 10, "author": "a@b.ru",
+ "image": "recipes/images/3f/a9/3fa9....png", "image_data": "<base64>",
+ "tags": ["breakfast"],
+ "ingredients": [{"name": "соль", "measurement_unit": "г", "amount": 5}]}
+
+image_data есть только при экспорте с картинками. Экспорт и импорт
+идут пачками, поэтому память не зависит от объёма данных.
+"""
+import base64
+import binascii
+import json
+import posixpath
+import time
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.files.base import ContentFile
+from django.core.validators import (MaxLengthValidator, MaxValueValidator,
+                                    MinValueValidator)
+from django.db import transaction
+from django.db.models import Max
+
+from recipes import changelog, tagstats
+from recipes.minhash import index_recipes
+from recipes.models import (Ingredient, IngredientAmount, Recipe,
+                            RecipeChange, Tag)
+from users.models import User
+
+storage = Recipe._meta.get_field('image').storage
+# Формат названий (validate_name) не проверяется: в справочнике
+# ингредиентов есть названия с дефисами и кавычками.
+CHECKED_VALIDATORS = (MaxLengthValidator, MinValueValidator,
+                      MaxValueValidator)
+
+
+def clean_value(model, name, value):
+    """Значение поля модели с проверкой типа, длины и диапазона."""
+    field = model._meta.get_field(name)
+    try:
+        value = field.to_python(value)
+        if value is None:
+            raise ValidationError('пустое значение')
+        for validator in field.validators:
+            if isinstance(validator, CHECKED_VALIDATORS):
+                validator(value)
+    except ValidationError as error:
+        raise ValidationError(f'{name}: {" ".join(error.messages)}')
+    return value
+
+
+def export_recipes(queryset=None, batch_size=500, embed_images=False):
+    """Строки NDJSON (bytes) по рецептам queryset в порядке id."""
+    queryset = Recipe.objects.all() if queryset is None else queryset
+    queryset = queryset.order_by('id')
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).values(
+                'id', 'name', 'text', 'cooking_time', 'image',
+                'author__email',
+            )[:batch_size]
+        )
+        if not rows:
+            return
+        last_id = rows[-1]['id']
+        recipe_ids = [row['id'] for row in rows]
+        tags = defaultdict(list)
+        links = (Recipe.tags.through.objects
+                 .filter(recipe_id__in=recipe_ids).order_by('id')
+                 .values_list('recipe_id', 'tag__slug'))
+        for recipe_id, slug in links:
+            tags[recipe_id].append(slug)
+        ingredients = defaultdict(list)
+        amounts = (IngredientAmount.objects
+                   .filter(recipe_id__in=recipe_ids).order_by('id')
+                   .values_list('recipe_id', 'ingredient__name',
+                                'ingredient__measurement_unit', 'amount'))
+        for recipe_id, name, unit, amount in amounts:
+            ingredients[recipe_id].append(
+                {'name': name, 'measurement_unit': unit, 'amount': amount}
+            )
+        for row in rows:
+            record = {
+                'name': row['name'],
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+                'author': row['author__email'],
+                'image': row['image'],
+                'tags': tags[row['id']],
+                'ingredients': ingredients[row['id']],
+            }
+            if embed_images:
+                with storage.open(row['image']) as file:
+                    record['image_data'] = base64.b64encode(
+                        file.read()
+                    ).decode('ascii')
+            yield json.dumps(record, ensure_ascii=False).encode() + b'\n'
+
+
+class Importer:
+    """Импорт NDJSON пачками через bulk_create.
+
+    Теги ищутся по slug, ингредиенты по (name, measurement_unit),
+    недостающие ингредиенты создаются. Авторы ищутся по email; если
+    автора нет, используется default_author, иначе строка пропускается.
+    """
+
+    def __init__(self, batch_size=500, default_author=None):
+        self.batch_size = batch_size
+        self.default_author = default_author
+        self.stats = {'lines': 0, 'recipes': 0, 'ingredients': 0,
+                      'tags': 0, 'skipped': 0, 'errors': []}
+
+    def run(self, lines):
+        started = time.perf_counter()
+        lines = (line for line in lines if line.strip())
+        while True:
+            batch = list(islice(lines, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = round(elapsed, 3)
+        rows = (self.stats['recipes'] + self.stats['ingredients']
+                + self.stats['tags'])
+        self.stats['rows_per_second'] = round(rows / elapsed if elapsed
+                                              else 0, 1)
+        return self.stats
+
+    def error(self, line_number, message):
+        self.stats['skipped'] += 1
+        self.stats['errors'].append(f'{line_number}: {message}')
+
+    def parse(self, batch):
+        records = []
+        for line in batch:
+            self.stats['lines'] += 1
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                self.error(self.stats['lines'], f'неверный JSON: {error}')
+                continue
+            message = self.validate(record)
+            if message is not None:
+                self.error(self.stats['lines'], message)
+                continue
+            record['line'] = self.stats['lines']
+            records.append(record)
+        return records
+
+    @staticmethod
+    def has_required_fields(record):
+        return (
+            isinstance(record, dict)
+            and {'name', 'image'} <= record.keys()
+            and isinstance(record['image'], str)
+            and isinstance(record.get('author', ''), (str, type(None)))
+            and isinstance(record.get('ingredients', []), list)
+            and isinstance(record.get('tags', []), list)
+            and all(isinstance(slug, str) for slug in record.get('tags', ()))
+            and all(
+                isinstance(item, dict)
+                and {'name', 'measurement_unit', 'amount'} <= item.keys()
+                for item in record.get('ingredients', ())
+            )
+        )
+
+    @classmethod
+    def validate(cls, record):
+        """Текст ошибки или None; приводит значения строки к типам полей.
+
+        Строка, нарушающая ограничения модели, пропускается, иначе
+        ошибка базы прервала бы импорт всей пачки.
+        """
+        if not cls.has_required_fields(record):
+            return 'нет обязательных полей'
+        try:
+            for name, default in (('name', None), ('text', ''),
+                                  ('cooking_time', 1)):
+                record[name] = clean_value(Recipe, name,
+                                           record.get(name, default))
+            for item in record.get('ingredients', ()):
+                for name in ('name', 'measurement_unit'):
+                    item[name] = clean_value(Ingredient, name, item[name])
+                item['amount'] = clean_value(IngredientAmount, 'amount',
+                                             item['amount'])
+        except ValidationError as error:
+            return error.messages[0]
+        if len(record['image']) > Recipe._meta.get_field('image').max_length:
+            return 'image: слишком длинное имя'
+        data = record.get('image_data')
+        if data is not None:
+            try:
+                record['image_data'] = base64.b64decode(data, validate=True)
+            except (binascii.Error, TypeError, ValueError):
+                return 'image_data: неверный base64'
+        return None
+
+    def resolve_ingredients(self, records):
+        keys = {
+            (item['name'], item['measurement_unit'])
+            for record in records for item in record.get('ingredients', ())
+        }
+        names = {name for name, _ in keys}
+        known = {
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.filter(name__in=names)
+            .values_list('id', 'name', 'measurement_unit')
+        }
+        missing = keys - known.keys()
+        if missing:
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in missing),
+                ignore_conflicts=True,
+            )
+            known.update(
+                ((name, unit), pk) for pk, name, unit in
+                Ingredient.objects.filter(name__in={n for n, _ in missing})
+                .values_list('id', 'name', 'measurement_unit')
+            )
+        return known
+
+    def resolve_image(self, record):
+        data = record.get('image_data')
+        if data is not None:
+            # Имя из экспорта уже разложено по хешу, хранилище разложит
+            # его заново от каталога upload_to.
+            name = posixpath.join(
+                Recipe._meta.get_field('image').upload_to,
+                posixpath.basename(record['image']),
+            )
+            return storage.save(name, ContentFile(data))
+        try:
+            if not storage.exists(record['image']):
+                return None
+        except SuspiciousFileOperation:
+            return None
+        retain = getattr(storage, 'retain', None)
+        if retain is not None:
+            retain(record['image'])
+        return record['image']
+
+    def import_batch(self, batch):
+        records = self.parse(batch)
+        tags = {slug: pk for slug, pk in Tag.objects.filter(
+            slug__in={slug for record in records
+                      for slug in record.get('tags', ())}
+        ).values_list('slug', 'id')}
+        authors = {email: pk for email, pk in User.objects.filter(
+            email__in={record.get('author') for record in records}
+        ).values_list('email', 'id')}
+        with transaction.atomic():
+            ingredients = self.resolve_ingredients(records)
+            recipes, accepted = [], []
+            for record in records:
+                author = authors.get(record.get('author'),
+                                     self.default_author)
+                if author is None:
+                    self.error(record['line'], 'автор не найден')
+                    continue
+                image = self.resolve_image(record)
+                if image is None:
+                    self.error(record['line'], 'картинка не найдена')
+                    continue
+                recipes.append(Recipe(
+                    author_id=author, name=record['name'],
+                    text=record.get('text', ''), image=image,
+                    cooking_time=record.get('cooking_time', 1),
+                ))
+                accepted.append(record)
+            recipe_ids = self.create_recipes(recipes)
+            amounts, links = [], []
+            for recipe_id, record in zip(recipe_ids, accepted):
+                amounts.extend(
+                    IngredientAmount(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredients[
+                            (item['name'], item['measurement_unit'])
+                        ],
+                        amount=item['amount'],
+                    )
+                    for item in record.get('ingredients', ())
+                )
+                links.extend(
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tags[slug])
+                    for slug in dict.fromkeys(record.get('tags', ()))
+                    if slug in tags
+                )
+            IngredientAmount.objects.bulk_create(amounts,
+                                                 ignore_conflicts=True)
+            Recipe.tags.through.objects.bulk_create(links,
+                                                    ignore_conflicts=True)
+            index_recipes(recipe_ids)
+            changelog.record(recipe_ids, RecipeChange.CREATED)
+            tagstats.adjust(Counter(link.tag_id for link in links))
+            changelog.recipes_created.send(sender=Recipe, ids=recipe_ids)
+        self.stats['recipes'] += len(recipe_ids)
+        self.stats['ingredients'] += len(amounts)
+        self.stats['tags'] += len(links)
+
+    @staticmethod
+    def create_recipes(recipes):
+        """id созданных рецептов в порядке списка.
+
+        Без RETURNING (SQLite) id добираются по возрастанию внутри той же
+        транзакции.
+        """
+        last_id = Recipe.objects.aggregate(last=Max('id'))['last'] or 0
+        created = Recipe.objects.bulk_create(recipes)
+        if all(recipe.pk is not None for recipe in created):
+            return [recipe.pk for recipe in created]
+        return list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', flat=True)
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_auto_20231210_1857'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredientamount',
+            options={'ordering': ('id',), 'verbose_name': 'Ингредиент в рецепте', 'verbose_name_plural': 'Ингредиенты в рецепте'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ('-pub_date', '-id'), 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_minhash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredientamount',
+            index=models.Index(fields=['recipe'], include=('ingredient', 'amount'), name='ingredient_amount_covering'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date'),
+        ),
+    ]
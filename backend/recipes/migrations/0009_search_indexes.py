@@ -0,0 +1,43 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# name__istartswith / name__icontains в PostgreSQL превращаются
+# в UPPER(name) LIKE ..., поэтому индексы строятся по выражению.
+SEARCH_INDEXES = (
+    ('ingredient_name_prefix', 'recipes_ingredient',
+     'btree (UPPER(name) text_pattern_ops)'),
+    ('ingredient_name_trgm', 'recipes_ingredient',
+     'gin (UPPER(name) gin_trgm_ops)'),
+    ('recipe_name_trgm', 'recipes_recipe',
+     'gin (UPPER(name) gin_trgm_ops)'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, definition in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} USING {definition}'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0008_index_pack'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:08
+
+from django.db import migrations, models
+
+
+def log_existing_recipes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeChange = apps.get_model('recipes', 'RecipeChange')
+    recipe_ids = Recipe.objects.order_by('id').values_list('id', flat=True)
+    RecipeChange.objects.bulk_create(
+        (RecipeChange(recipe_id=recipe_id, action='created')
+         for recipe_id in recipe_ids.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(verbose_name='Id рецепта')),
+                ('action', models.CharField(choices=[('created', 'Создан'), ('updated', 'Изменён'), ('deleted', 'Удалён')], max_length=7, verbose_name='Действие')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время')),
+            ],
+            options={
+                'verbose_name': 'Изменение рецепта',
+                'verbose_name_plural': 'Журнал изменений рецептов',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.RunPython(log_existing_recipes,
+                             migrations.RunPython.noop),
+    ]
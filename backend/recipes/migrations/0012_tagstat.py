@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:24
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def count_existing_recipes(apps, schema_editor):
+    Tag = apps.get_model('recipes', 'Tag')
+    TagStat = apps.get_model('recipes', 'TagStat')
+    counts = Tag.objects.annotate(recipes_count=Count('tags'))
+    TagStat.objects.bulk_create(
+        TagStat(tag_id=tag.id, recipes_count=tag.recipes_count)
+        for tag in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stat', serialize=False, to='recipes.tag', verbose_name='Тег')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Число рецептов')),
+            ],
+            options={
+                'verbose_name': 'Статистика тега',
+                'verbose_name_plural': 'Статистика тегов',
+            },
+        ),
+        migrations.RunPython(count_existing_recipes,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,129 @@
+"""MinHash-сигнатуры наборов ингредиентов и LSH-поиск похожих рецептов.
+
+Доля совпадающих позиций двух сигнатур оценивает коэффициент Жаккара
+наборов ингредиентов. Сигнатура режется на полосы; рецепты, совпавшие
+хотя бы в одной полосе, становятся кандидатами, так что поиск не
+сравнивает рецепт со всеми остальными.
+"""
+import hashlib
+import random
+from array import array
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from recipes.models import IngredientAmount, RecipeBand, RecipeSignature
+
+PRIME = (1 << 31) - 1
+
+_random = random.Random(settings.MINHASH_SEED)
+PERMUTATIONS = tuple(
+    (_random.randrange(1, PRIME), _random.randrange(0, PRIME))
+    for _ in range(settings.MINHASH_PERMUTATIONS)
+)
+ROWS_PER_BAND = settings.MINHASH_PERMUTATIONS // settings.MINHASH_BANDS
+
+
+def signature(ingredient_ids):
+    ingredient_ids = set(ingredient_ids)
+    if not ingredient_ids:
+        return array('I', [PRIME] * len(PERMUTATIONS))
+    return array('I', (
+        min((a * value + b) % PRIME for value in ingredient_ids)
+        for a, b in PERMUTATIONS
+    ))
+
+
+def pack(minhash):
+    return minhash.tobytes()
+
+
+def unpack(data):
+    minhash = array('I')
+    minhash.frombytes(bytes(data))
+    return minhash
+
+
+def buckets(minhash):
+    """Пары (полоса, корзина); корзина — 64-битный хеш значений полосы."""
+    for band in range(settings.MINHASH_BANDS):
+        rows = minhash[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'big', signed=True)
+
+
+def similarity(first, second):
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def index_recipe(recipe, ingredient_ids):
+    minhash = signature(ingredient_ids)
+    with transaction.atomic():
+        RecipeSignature.objects.update_or_create(
+            recipe=recipe, defaults={'minhash': pack(minhash)}
+        )
+        RecipeBand.objects.filter(recipe=recipe).delete()
+        RecipeBand.objects.bulk_create(
+            RecipeBand(recipe=recipe, band=band, bucket=bucket)
+            for band, bucket in buckets(minhash)
+        )
+    return minhash
+
+
+def index_recipes(recipe_ids):
+    """Пересчитывает сигнатуры пачки рецептов за несколько запросов."""
+    ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+    rows = (IngredientAmount.objects.filter(recipe_id__in=recipe_ids)
+            .values_list('recipe_id', 'ingredient_id'))
+    for recipe_id, ingredient_id in rows:
+        ingredients[recipe_id].append(ingredient_id)
+    signatures, bands = [], []
+    for recipe_id, ingredient_ids in ingredients.items():
+        minhash = signature(ingredient_ids)
+        signatures.append(
+            RecipeSignature(recipe_id=recipe_id, minhash=pack(minhash))
+        )
+        bands.extend(
+            RecipeBand(recipe_id=recipe_id, band=band, bucket=bucket)
+            for band, bucket in buckets(minhash)
+        )
+    with transaction.atomic():
+        RecipeSignature.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeBand.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeSignature.objects.bulk_create(signatures)
+        RecipeBand.objects.bulk_create(bands, batch_size=1000)
+
+
+def similar_recipes(recipe_id, threshold=None, limit=None):
+    """Пары (recipe_id, оценка Жаккара) по убыванию оценки."""
+    if threshold is None:
+        threshold = settings.MINHASH_THRESHOLD
+    own = (RecipeSignature.objects.filter(recipe_id=recipe_id)
+           .values_list('minhash', flat=True).first())
+    if own is None:
+        return []
+    own = unpack(own)
+    candidates = (
+        RecipeBand.objects.filter(reduce(or_, (
+            Q(band=band, bucket=bucket) for band, bucket in buckets(own)
+        )))
+        .exclude(recipe_id=recipe_id)
+        .values_list('recipe_id', flat=True).distinct()
+    )
+    signatures = RecipeSignature.objects.filter(
+        recipe_id__in=candidates
+    ).values_list('recipe_id', 'minhash')
+    result = sorted(
+        (
+            (candidate, score) for candidate, score in (
+                (candidate, similarity(own, unpack(minhash)))
+                for candidate, minhash in signatures
+            )
+            if score >= threshold
+        ),
+        key=lambda pair: (-pair[1], pair[0]),
+    )
+    return result[:limit]
@@ -82,11 +82,18 @@ class Recipe(models.Model):
                                   related_name='tags',
                                   db_index=True,)
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_pub_date'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='recipe_author_pub_date'),
+        )
 
     def __str__(self):
         return (
@@ -95,8 +102,8 @@ class Recipe(models.Model):
         )
 
     @staticmethod
-    def get_detail_recipe(user):
-        ingredients = (
+    def shopping_cart_ingredients(user):
+        return (
             IngredientAmount.objects.filter(
                 recipe__userscarts__user=user,
             )
@@ -106,6 +113,10 @@ class Recipe(models.Model):
                 'ingredient__measurement_unit',
             ).annotate(ingredient_value=Sum('amount'))
         )
+
+    @staticmethod
+    def get_detail_recipe(user):
+        ingredients = Recipe.shopping_cart_ingredients(user)
         list_ingredients = ''
         list_ingredients += '\n'.join(
             [
@@ -150,7 +161,13 @@ class IngredientAmount(models.Model):
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецепте'
+        ordering = ('id',)
         unique_together = ('recipe', 'ingredient')
+        indexes = (
+            # Список покупок читается только из индекса.
+            models.Index(fields=('recipe',), include=('ingredient', 'amount'),
+                         name='ingredient_amount_covering'),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('recipe', 'ingredient'),
@@ -159,7 +176,7 @@ class IngredientAmount(models.Model):
         )
 
     def __str__(self) -> str:
-        return f'В рецепе {self.amount} есть ингредиент {self.ingredients}'
+        return f'В рецепе {self.amount} есть ингредиент {self.ingredient}'
 
 
 class BaseUserRecipe(models.Model):
@@ -209,3 +226,197 @@ class ShoppingCart(BaseUserRecipe):
 
     def __str__(self):
         return f'{self.user.username} -> {self.recipe.name}'
+
+
+class StoredFile(models.Model):
+    name = models.CharField('Имя файла', max_length=255, unique=True)
+    references = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл в хранилище'
+        verbose_name_plural = 'Файлы в хранилище'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class FeedItem(models.Model):
+    """Запись ленты подписчика: рецепт автора, на которого он подписан."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_feed_user_recipe'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-recipe'),
+                         name='feed_user_position'),
+        )
+
+    def __str__(self):
+        return f'{self.user} <- {self.recipe_id}'
+
+
+class SimilarRecipe(models.Model):
+    """Соседи рецепта по совместному добавлению в избранное.
+
+    Заполняется командой compute_similar.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Рецепт',
+    )
+    neighbour = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField('Косинусная близость')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        ordering = ('-score', 'neighbour')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'neighbour'),
+                name='unique_similar_recipe_neighbour',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.neighbour_id}: {self.score:.3f}'
+
+
+class Watermark(models.Model):
+    """Последний обработанный id источника для инкрементальных расчётов."""
+
+    name = models.CharField('Источник', max_length=64, unique=True)
+    last_id = models.BigIntegerField('Последний id', default=0)
+
+    class Meta:
+        verbose_name = 'Отметка обработки'
+        verbose_name_plural = 'Отметки обработки'
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
+
+
+class RecipeSignature(models.Model):
+    """MinHash-сигнатура набора ингредиентов рецепта.
+
+    Хранится упакованным массивом беззнаковых 32-битных чисел.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Рецепт',
+    )
+    minhash = models.BinaryField('MinHash')
+
+    class Meta:
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+    def __str__(self):
+        return f'Сигнатура рецепта {self.recipe_id}'
+
+
+class RecipeBand(models.Model):
+    """LSH-корзина одной полосы сигнатуры."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='bands',
+        verbose_name='Рецепт',
+    )
+    band = models.PositiveSmallIntegerField('Полоса')
+    bucket = models.BigIntegerField('Корзина')
+
+    class Meta:
+        verbose_name = 'LSH-корзина'
+        verbose_name_plural = 'LSH-корзины'
+        indexes = (
+            models.Index(fields=('band', 'bucket'), name='recipe_band_bucket'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.band}/{self.bucket}'
+
+
+class RecipeChange(models.Model):
+    """Запись журнала изменений рецептов для синхронизации клиентов.
+
+    id служит водяным знаком: клиент запрашивает изменения после
+    последнего полученного id. Удаления остаются в журнале как надгробия.
+    """
+
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = (
+        (CREATED, 'Создан'),
+        (UPDATED, 'Изменён'),
+        (DELETED, 'Удалён'),
+    )
+
+    recipe_id = models.BigIntegerField('Id рецепта')
+    action = models.CharField('Действие', max_length=7, choices=ACTIONS)
+    created_at = models.DateTimeField('Время', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Журнал изменений рецептов'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.id}: {self.recipe_id} {self.action}'
+
+
+class TagStat(models.Model):
+    """Число рецептов с тегом для фасетов списка без фильтров.
+
+    Пересчитывается для затронутых тегов при изменении связей
+    рецептов с тегами.
+    """
+
+    tag = models.OneToOneField(
+        Tag,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stat',
+        verbose_name='Тег',
+    )
+    recipes_count = models.PositiveIntegerField('Число рецептов', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика тега'
+        verbose_name_plural = 'Статистика тегов'
+
+    def __str__(self):
+        return f'{self.tag_id}: {self.recipes_count}'
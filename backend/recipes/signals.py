@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from recipes.models import Recipe
+
+
+def release_image(name):
+    if name:
+        storage = Recipe._meta.get_field('image').storage
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_previous_image(sender, instance, **kwargs):
+    instance._previous_image = None
+    if instance.pk is None or instance.image._committed:
+        return
+    instance._previous_image = (
+        Recipe.objects.filter(pk=instance.pk)
+        .values_list('image', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_image(sender, instance, created, **kwargs):
+    release_image(getattr(instance, '_previous_image', None))
+    instance._previous_image = None
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    release_image(instance.image.name)
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import posixpath
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы именуются хешем содержимого и раскладываются по подкаталогам.
+
+    recipes/images/<uuid>.png -> recipes/images/3f/a9/3fa9....png.
+    Одинаковое содержимое хранится один раз, число ссылок ведётся в
+    StoredFile; delete() уменьшает счётчик и удаляет файл на последней
+    ссылке. Имена неизменяемы, поэтому их можно кешировать навсегда.
+    """
+
+    hash_algorithm = 'sha256'
+    shard_levels = 2
+    shard_width = 2
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, self.digest(content))
+        try:
+            # Повторная загрузка «молодит» файл, иначе collect_media
+            # может счесть его старым сиротой до фиксации рецепта.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            name = self._save(name, content)
+        self.retain(name)
+        return name.replace('\\', '/')
+
+    def get_available_name(self, name, max_length=None):
+        """Занятое имя не заменяется другим: оно часть адреса содержимого.
+
+        FileSystemStorage._save вызывает этот метод, когда файл уже
+        создан параллельной загрузкой; исключение возвращает в _save.
+        """
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+    def _save(self, name, content):
+        try:
+            return super()._save(name, content)
+        except FileExistsError:
+            # Тот же хеш — то же содержимое, копия с суффиксом не нужна.
+            return name
+
+    def digest(self, content):
+        hasher = hashlib.new(self.hash_algorithm)
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return hasher.hexdigest()
+
+    def hashed_name(self, name, digest):
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        extension = os.path.splitext(name)[1].lower()
+        shards = [
+            digest[level * self.shard_width:(level + 1) * self.shard_width]
+            for level in range(self.shard_levels)
+        ]
+        return posixpath.join(directory, *shards, digest + extension)
+
+    @staticmethod
+    def records():
+        return apps.get_model('recipes', 'StoredFile').objects
+
+    def retain(self, name, references=1):
+        records = self.records()
+        records.get_or_create(name=name)
+        records.filter(name=name).update(
+            references=F('references') + references
+        )
+
+    def delete(self, name):
+        with transaction.atomic():
+            record = self.records().select_for_update().filter(
+                name=name
+            ).first()
+            if record is not None and record.references > 1:
+                record.references -= 1
+                record.save(update_fields=('references',))
+                return
+            if record is not None:
+                record.delete()
+        super().delete(name)
@@ -0,0 +1,112 @@
+"""Счётчики рецептов по тегам (TagStat).
+
+Изменения связей рецептов с тегами применяются к счётчикам атомарным
+UPDATE ... SET recipes_count = recipes_count + n, поэтому параллельные
+транзакции не теряют изменения друг друга. Полный пересчёт по
+промежуточной таблице нужен только для тегов без строки счётчика и
+после массовой загрузки. Массовые операции в обход сигналов вызывают
+adjust() или recount() сами.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes.deletion import recipes_deleted
+from recipes.models import Recipe, Tag, TagStat
+
+RecipeTag = Recipe.tags.through
+
+
+def recount(tag_ids=None):
+    """Пересчитывает счётчики тегов tag_ids, без аргумента — всех."""
+    tags = Tag.objects.all()
+    if tag_ids is not None:
+        tags = tags.filter(pk__in=list(tag_ids))
+    tag_ids = list(tags.values_list('pk', flat=True))
+    if not tag_ids:
+        return
+    TagStat.objects.bulk_create(
+        (TagStat(tag_id=tag_id) for tag_id in tag_ids),
+        ignore_conflicts=True,
+    )
+    counts = (RecipeTag.objects.filter(tag_id=OuterRef('tag_id'))
+              .order_by().values('tag_id')
+              .annotate(count=Count('recipe_id')).values('count'))
+    TagStat.objects.filter(tag_id__in=tag_ids).update(
+        recipes_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+def adjust(deltas):
+    """Прибавляет к счётчикам {id тега: изменение числа рецептов}."""
+    groups = defaultdict(list)
+    for tag_id, delta in deltas.items():
+        if delta:
+            groups[delta].append(tag_id)
+    for delta, tag_ids in groups.items():
+        updated = TagStat.objects.filter(tag_id__in=tag_ids).update(
+            recipes_count=F('recipes_count') + delta
+        )
+        if updated < len(tag_ids):
+            recount(set(tag_ids) - set(
+                TagStat.objects.filter(tag_id__in=tag_ids)
+                .values_list('tag_id', flat=True)
+            ))
+
+
+def counts():
+    return dict(TagStat.objects.values_list('tag_id', 'recipes_count'))
+
+
+def linked_tags(instance, reverse, pk_set=None):
+    """Существующие связи изменения m2m: Counter {id тега: число}."""
+    links = RecipeTag.objects.filter(
+        **{'tag_id' if reverse else 'recipe_id': instance.pk}
+    )
+    if pk_set is not None:
+        links = links.filter(
+            **{'recipe_id__in' if reverse else 'tag_id__in': pk_set}
+        )
+    return Counter(links.values_list('tag_id', flat=True))
+
+
+@receiver(m2m_changed, sender=RecipeTag)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        # Django передаёт в post_add только действительно добавленные id.
+        if reverse:
+            adjust({instance.pk: len(pk_set)})
+        else:
+            adjust(dict.fromkeys(pk_set, 1))
+    elif action == 'pre_remove':
+        instance._removed_tags = linked_tags(instance, reverse, pk_set)
+    elif action == 'pre_clear':
+        instance._removed_tags = linked_tags(instance, reverse)
+    elif action in ('post_remove', 'post_clear'):
+        adjust({tag_id: -count for tag_id, count
+                in instance._removed_tags.items()})
+
+
+@receiver(post_save, sender=Tag)
+def tag_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        TagStat.objects.get_or_create(tag=instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_recipe_tags(sender, instance, **kwargs):
+    instance._deleted_tags = list(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    adjust(dict.fromkeys(getattr(instance, '_deleted_tags', ()), -1))
+
+
+@receiver(recipes_deleted, sender=Recipe)
+def recipes_batch_deleted(sender, ids, tags=None, **kwargs):
+    adjust({tag_id: -count for tag_id, count in (tags or {}).items()})
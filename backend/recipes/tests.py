@@ -0,0 +1,68 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import User
+
+CHANGELISTS = {
+    'рецепты': '/admin/recipes/recipe/',
+    'избранное': '/admin/recipes/favorite/',
+    'корзины': '/admin/recipes/shoppingcart/',
+}
+# Сессия, пользователь, COUNT, строки страницы и у рецептов — теги
+# для фильтра.
+QUERIES = {'рецепты': 5, 'избранное': 4, 'корзины': 4}
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AdminChangelistQueryTests(TestCase):
+    """Число запросов страниц списка в админке не зависит от числа строк."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            username='admin', email='admin@example.com',
+            is_staff=True, is_superuser=True,
+        )
+        cls.authors = [
+            User.objects.create(username=f'author{number}',
+                                email=f'author{number}@example.com')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        start = Recipe.objects.count()
+        for number in range(start, start + count):
+            author = self.authors[number % len(self.authors)]
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=10, image='recipes/images/test.gif',
+            )
+            Favorite.objects.create(user=author, recipe=recipe)
+            ShoppingCart.objects.create(user=author, recipe=recipe)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_counts(self):
+        self.add_rows(10)
+        for name, url in CHANGELISTS.items():
+            with self.subTest(changelist=name):
+                with self.assertNumQueries(QUERIES[name]):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        self.add_rows(2)
+        few = {name: self.changelist_queries(url)
+               for name, url in CHANGELISTS.items()}
+        self.add_rows(20)
+        for name, url in CHANGELISTS.items():
+            with self.subTest(changelist=name):
+                self.assertEqual(self.changelist_queries(url), few[name])
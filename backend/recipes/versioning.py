@@ -0,0 +1,56 @@
+"""Продвижение Recipe.updated_at при изменениях, не сохраняющих рецепт.
+
+Сохранение самого рецепта обновляет поле через auto_now; ингредиенты
+рецепта меняются только вместе с ним (сериализатор, админка). Здесь
+обрабатываются теги рецепта и правки справочников, которые входят
+в ответ API.
+"""
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.changelog import record
+from recipes.models import Ingredient, Recipe, RecipeChange, Tag
+
+
+def touch(recipes):
+    recipe_ids = list(recipes.values_list('pk', flat=True))
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+        record(recipe_ids, RecipeChange.UPDATED)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch(Recipe.objects.filter(pk=instance.pk))
+    elif action == 'post_clear':
+        # Для post_clear pk_set не передаётся, id собраны в pre_clear.
+        touch(Recipe.objects.filter(pk__in=instance._cleared_recipes))
+    else:
+        touch(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def remember_cleared_recipes(sender, instance, action, reverse, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_recipes = list(
+            instance.tags.values_list('pk', flat=True)
+        )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    if not kwargs.get('created'):
+        touch(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    if not kwargs['created']:
+        touch(Recipe.objects.filter(recipe_ingredients__ingredient=instance))
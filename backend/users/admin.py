@@ -1,18 +1,27 @@
 from django.contrib import admin
 
+from recipes.admin_mixins import BulkDeleteMixin
+from recipes.deletion import schedule_user_deletion
 from users.models import Follow, User
 
 
 @admin.register(User)
-class UsersAdmin(admin.ModelAdmin):
+class UsersAdmin(BulkDeleteMixin, admin.ModelAdmin):
     list_display = ('id', 'username', 'last_name', 'first_name',
                     'email', 'is_staff', 'date_joined')
     search_fields = ('username', 'first_name', 'last_name', 'email')
-    list_filter = ('username', 'email', 'is_staff', 'date_joined')
+    list_filter = ('is_staff', 'date_joined')
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    # Авторы с большим числом рецептов удаляются фоновой задачей,
+    # а не внутри транзакции запроса админки.
+    object_deleter = staticmethod(schedule_user_deletion)
 
 
 @admin.register(Follow)
 class FolowAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'author')
-    search_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    show_full_result_count = False
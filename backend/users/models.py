@@ -57,6 +57,14 @@ class Follow(models.Model):
                 fields=['user', 'author'],
             ),
         ]
+        indexes = [
+            # Подписчики автора без обращения к таблице.
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user'),
+            # Подписчики автора по убыванию id для постраничного вывода.
+            models.Index(fields=['author', '-id'],
+                         name='follow_author_id'),
+        ]
 
     def __str__(self):
         return f'Пользователь {self.user} подписан на {self.author}'